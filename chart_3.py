@@ -2,7 +2,6 @@
 
 import os
 import logging
-import requests
 import configparser
 import re
 import sys
@@ -10,18 +9,18 @@ import random
 import html
 import json
 import time
+import importlib.util
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright, expect
-from groq import Groq
-
-try:
-    import spacy
-    import pandas as pd
-    import mplfinance as mpf
-    from PIL import Image, ImageDraw, ImageFont
-except ImportError:
-    print("FATAL ERROR: A required library is not installed. Run: pip install spacy pandas matplotlib mplfinance Pillow")
+from concurrent.futures import ProcessPoolExecutor
+import entity_matcher
+import mem_profile
+import http_client
+
+# Heavy libraries (spacy, pandas, mplfinance, playwright, groq) are imported by the step that uses them,
+# so a run that fails setup or finds nothing to post never pays for them. Only check they are installed here.
+REQUIRED_LIBRARIES = ["spacy", "pandas", "mplfinance", "PIL", "playwright", "groq"]
+if any(importlib.util.find_spec(name) is None for name in REQUIRED_LIBRARIES):
+    print("FATAL ERROR: A required library is not installed. Run: pip install spacy pandas matplotlib mplfinance Pillow playwright groq")
     sys.exit(1)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(filename)s] - %(message)s')
@@ -32,8 +31,16 @@ CONFIG_FILE = "config.ini"
 HYPE_HISTORY_FILE = "hype_history.txt" # New history file for this tweet style
 AUTH_FILE = "auth_x.json"
 CHART_FILE = "generated_chart.png"
+GALLERY_DIR = "chart_gallery" # --gallery writes <TICKER>.png per ticker plus index.json here
+GALLERY_WORKERS = os.cpu_count() or 2
+CHART_DPI = 120
+# Width of the candle axes: mplfinance sizes figratio (18, 10) to 10.35 x 5.75 in, about 1000 px of plot area at CHART_DPI.
+CHART_PLOT_WIDTH_PX = 1000
+MIN_PX_PER_CANDLE = 4 # Below this candles blur into each other, so switch to weekly/monthly bars
+BAR_INTERVALS = [("D", 1), ("W-MON", 7), ("MS", 30.44)] # (resample rule, days per bar), finest first
 GROQ_API_KEY = None
 NLP_MODEL = None
+MENTION_MATCHER = None # Built on first use from TWITTER_HANDLES
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
 
 # Expanded handles for greater reach on the chart
@@ -48,16 +55,23 @@ TICKER_MAP = {
 
 # --- HELPER FUNCTIONS (Some NEW, some UNCHANGED) ---
 def setup_environment():
-    global GROQ_API_KEY, NLP_MODEL
+    global GROQ_API_KEY
     if not os.path.exists(CONFIG_FILE): logger.error(f"FATAL: Config file '{CONFIG_FILE}' not found."); return False
     config = configparser.ConfigParser(); config.read(CONFIG_FILE)
     GROQ_API_KEY = config.get('API_KEYS', 'GROQ_API_KEY', fallback=None)
     if not GROQ_API_KEY: logger.error(f"FATAL: GROQ_API_KEY not found."); return False
     if not os.path.exists(AUTH_FILE): logger.error(f"FATAL: Auth file '{AUTH_FILE}' not found. Please run 'get_auth.py' to create it."); return False
-    try: NLP_MODEL = spacy.load("en_core_web_sm")
-    except OSError: logger.error("FATAL: spaCy model not found. Run 'python -m spacy download en_core_web_sm'"); return False
+    if importlib.util.find_spec("en_core_web_sm") is None: logger.error("FATAL: spaCy model not found. Run 'python -m spacy download en_core_web_sm'"); return False
     logger.info("Environment setup successful."); return True
 
+def get_nlp_model():
+    """Loads the spaCy pipeline on first use (only needed once a tweet is being written)."""
+    global NLP_MODEL
+    if NLP_MODEL is None:
+        import spacy
+        NLP_MODEL = spacy.load("en_core_web_sm")
+    return NLP_MODEL
+
 def load_processed_hype_posts():
     """Loads used (ticker, date) combinations to avoid repetition."""
     if not os.path.exists(HYPE_HISTORY_FILE): return set()
@@ -70,9 +84,10 @@ def save_processed_hype_post(ticker, date_str):
 
 def get_historical_data(ticker, days=1825): # Fetch 5 years of data
     """Fetches daily historical price data for a given crypto ticker."""
+    import pandas as pd
     try:
         url = f"https://min-api.cryptocompare.com/data/v2/histoday?fsym={ticker.upper()}&tsym=USD&limit={days}"
-        response = requests.get(url)
+        response = http_client.cached_get(url)
         response.raise_for_status()
         data = response.json()['Data']['Data']
         if not data:
@@ -112,11 +127,15 @@ def find_significant_low(price_df, ticker, used_posts):
     logger.warning(f"Could not find a unique significant low for {ticker}. All candidates have been posted.")
     return None
 
-def get_llm_hype_tweet(ticker, roi, years, low_price, current_price, client):
-    """Generates a hype-focused tweet using an LLM."""
+def get_llm_hype_tweet(ticker, roi, years, low_price, current_price, client, market_context=None):
+    """Generates a hype-focused tweet using an LLM. market_context (price_matrix.query output) adds cross-asset facts."""
     logger.info("Requesting LLM for a new HYPE tweet...")
     system_prompt = "You are 'Alpha Intel', a crypto analyst known for viral, hype-generating tweets. Your goal is to create a tweet that shows the massive potential of holding cryptocurrencies. Focus on a 'what if' scenario. Be exciting and forward-looking. Output ONLY the tweet text, under 260 characters."
     user_content = f"Create a tweet for ${ticker}. A $1,000 investment at the low of ${low_price:,.2f} about {years:.1f} years ago would now be worth over ${1000 * roi:,.0f}. The ROI is over {roi:,.0f}x. Make it punchy and add a bold prediction or a question about where it's going next."
+    if market_context and market_context.get("strength_rank") is not None:
+        user_content += f" Context: over the last 30 days ${ticker} ranks #{market_context['strength_rank']:.0f} of {market_context['universe_size']} tracked coins ({market_context['strength_return']:+.0%})"
+        if market_context.get("beta_to_btc") is not None and ticker != "BTC": user_content += f", with a beta of {market_context['beta_to_btc']:.1f} to BTC"
+        user_content += "."
 
     try:
         completion = client.chat.completions.create(
@@ -131,20 +150,51 @@ def get_llm_hype_tweet(ticker, roi, years, low_price, current_price, client):
         logger.error(f"LLM request failed: {e}")
         return f"${ticker} has shown incredible growth. What's next for the crypto giant?"
 
-def create_hype_chart(ticker, price_df, low_point, your_x_handle):
-    """Generates a chart proving the 'what if' scenario, designed for social media."""
+def choose_bar_interval(span_days, width_px=CHART_PLOT_WIDTH_PX):
+    """Picks the finest bar interval that still gives every candle at least MIN_PX_PER_CANDLE pixels."""
+    for rule, days_per_bar in BAR_INTERVALS:
+        if (span_days / days_per_bar) * MIN_PX_PER_CANDLE <= width_px:
+            return rule
+    return BAR_INTERVALS[-1][0]
+
+def resample_ohlcv(price_df, rule):
+    """Aggregates daily candles into coarser bars, each labeled with its first day."""
+    if rule == "D":
+        return price_df
+    bars = price_df.resample(rule, label='left', closed='left')
+    return bars.agg({"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}).dropna(subset=["Close"])
+
+def create_hype_chart(ticker, price_df, low_point, your_x_handle, indicator_df=None, output_path=CHART_FILE):
+    """Generates a chart proving the 'what if' scenario, designed for social media, at output_path.
+    indicator_df (from indicators.compute_indicators) adds moving-average overlays when given."""
+    import matplotlib.pyplot as plt
+    import mplfinance as mpf
+    from PIL import Image, ImageDraw, ImageFont
+    import indicators
     try:
         # Prepare data for plotting
-        plot_data = price_df[price_df.index >= low_point.name]
-        current_price = plot_data.iloc[-1]
+        daily_data = price_df[price_df.index >= low_point.name]
+        current_price = daily_data.iloc[-1]
         low_date = low_point.name.strftime('%Y-%m-%d')
         current_date = current_price.name.strftime('%Y-%m-%d')
         roi = current_price['Close'] / low_point['Low']
 
+        # Level of detail: long spans are drawn as weekly or monthly bars so candles stay readable.
+        # The annotations above still come from the daily data, so prices and dates stay exact.
+        rule = choose_bar_interval((daily_data.index[-1] - daily_data.index[0]).days + 1)
+        plot_data = resample_ohlcv(daily_data, rule)
+        logger.info(f"Plotting {len(daily_data)} daily candles as {len(plot_data)} '{rule}' bars.")
+
         # Add plot elements to highlight the key points
         buy_marker = [float('nan')] * len(plot_data)
-        buy_marker[0] = plot_data['Low'][0] * 0.95 # Place marker slightly below the low
+        buy_marker[0] = low_point['Low'] * 0.95 # Place marker slightly below the low (always inside the first bar)
         ap0 = mpf.make_addplot(buy_marker, type='scatter', marker='^', color='lime', markersize=200)
+        addplots = [ap0]
+        if indicator_df is not None:
+            indicator_bars = indicator_df.loc[daily_data.index]
+            if rule != "D":
+                indicator_bars = indicator_bars.resample(rule, label='left', closed='left').last()
+            addplots += indicators.indicator_addplots(indicator_bars.reindex(plot_data.index))
 
         # Create the plot style
         style = mpf.make_mpf_style(base_mpf_style='nightclouds',
@@ -154,12 +204,13 @@ def create_hype_chart(ticker, price_df, low_point, your_x_handle):
         # Generate the main plot
         fig, axes = mpf.plot(plot_data, type='candle', style=style,
                              title=f"\n${ticker}/USD: The Power of Holding",
-                             volume=True, addplot=ap0,
+                             volume=True, addplot=addplots,
                              figratio=(18, 10), returnfig=True,
-                             savefig=dict(fname=CHART_FILE, dpi=120))
+                             savefig=dict(fname=output_path, dpi=CHART_DPI))
+        plt.close(fig) # The PNG is all we need; open figures would pile up across tickers
 
         # --- Add custom text and watermarks with PIL ---
-        image = Image.open(CHART_FILE)
+        image = Image.open(output_path)
         draw = ImageDraw.Draw(image)
         w, h = image.size
         try:
@@ -183,9 +234,9 @@ def create_hype_chart(ticker, price_df, low_point, your_x_handle):
         handles_to_tag = random.sample(list(TWITTER_HANDLES.values()), k=min(3, len(TWITTER_HANDLES)))
         draw.text((w - 200, h - 40), ' '.join(handles_to_tag), font=watermark_font, fill="rgba(255, 255, 255, 80)")
 
-        image.save(CHART_FILE)
-        logger.info(f"Hype chart for {ticker} generated at {CHART_FILE}")
-        return CHART_FILE
+        image.save(output_path)
+        logger.info(f"Hype chart for {ticker} generated at {output_path}")
+        return output_path
     except Exception as e:
         logger.error(f"Failed during hype chart generation for {ticker}: {e}")
         return None
@@ -193,21 +244,25 @@ def create_hype_chart(ticker, price_df, low_point, your_x_handle):
 def generate_hashtags(text, ticker):
     """Generates relevant hashtags for the tweet."""
     hashtags = {f"#{ticker}", "#Crypto", "#HODL", "#Investing", "#CryptoNews", "#Blockchain"}
-    doc = NLP_MODEL(text)
+    doc = get_nlp_model()(text)
     keywords = {ent.text.strip() for ent in doc.ents if ent.label_ in ['ORG', 'GPE']}
     for word in list(keywords)[:2]:
         hashtags.add(f"#{''.join(filter(str.isalnum, word))}")
     return " ".join(list(hashtags)[:6])
 
 def generate_mentions(text, max_mentions=2):
-    """Generates mentions based on keywords in the text."""
-    mentions = {handle for name, handle in TWITTER_HANDLES.items() if name.lower() in text.lower()}
-    return " ".join(list(mentions)[:max_mentions])
+    """Generates mentions based on keywords in the text, in the order they appear."""
+    global MENTION_MATCHER
+    if MENTION_MATCHER is None:
+        MENTION_MATCHER = entity_matcher.build_matcher(TWITTER_HANDLES)
+    mentions = list(dict.fromkeys(handle for _, _, handle in entity_matcher.find_entities(MENTION_MATCHER, text)))
+    return " ".join(mentions[:max_mentions])
 
 # --- UNCHANGED POSTING FUNCTION ---
 def post_final_tweet(tweet_content, chart_path=None):
     """Launches Playwright in DEBUG mode to diagnose the posting issue."""
     logger.info("--- Initiating Tweet Posting Sequence in INTERACTIVE DEBUG MODE ---")
+    from playwright.sync_api import sync_playwright, expect
     
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=False, slow_mo=500)
@@ -269,6 +324,8 @@ def post_final_tweet(tweet_content, chart_path=None):
 
 def main():
     if not setup_environment(): sys.exit(1)
+    from groq import Groq
+    import indicators
     llm_client = Groq(api_key=GROQ_API_KEY)
     processed_posts = load_processed_hype_posts()
     
@@ -282,7 +339,7 @@ def main():
 
     for ticker in available_tickers:
         logger.info(f"--- Attempting to generate hype post for {ticker} ---")
-        price_data = get_historical_data(ticker)
+        with mem_profile.stage(f"fetch {ticker}"): price_data = get_historical_data(ticker)
         if price_data is None:
             continue
             
@@ -304,7 +361,9 @@ def main():
         years_diff = (datetime.now() - low_point.name).days / 365.25
         roi_multiple = current_price / low_price
         
-        chart_path = create_hype_chart(ticker, price_data, low_point, "@AlphaIntel")
+        # Indicators need the full history (e.g. the 200-day SMA) even though only the span since the low is plotted.
+        with mem_profile.stage("indicators"): indicator_df = indicators.compute_indicators({ticker: price_data})[ticker]
+        with mem_profile.stage("chart"): chart_path = create_hype_chart(ticker, price_data, low_point, "@AlphaIntel", indicator_df)
         if not chart_path:
             logger.error(f"Failed to generate chart for {ticker}, trying next ticker.")
             continue
@@ -324,9 +383,12 @@ def main():
         logger.error("Failed to find any suitable cryptocurrency for a hype post after several attempts. Exiting.")
         sys.exit(1)
         
+    # Cross-asset context comes from the saved price matrix ('python price_matrix.py build'), when there is one.
+    import price_matrix
+    market_context = price_matrix.latest_snapshot(selected_ticker)
     tweet_body = get_llm_hype_tweet(
         selected_ticker, tweet_info['roi'], tweet_info['years'],
-        tweet_info['low_price'], tweet_info['current_price'], llm_client
+        tweet_info['low_price'], tweet_info['current_price'], llm_client, market_context
     )
     
     hashtags = generate_hashtags(tweet_body, selected_ticker)
@@ -336,12 +398,63 @@ def main():
     
     logger.info(f"\n--- FINAL TWEET ---\n{final_tweet}\n---------------------\n")
     
-    if post_final_tweet(final_tweet, chart_path):
+    with mem_profile.stage("post"): posted = post_final_tweet(final_tweet, chart_path)
+    if posted:
         save_processed_hype_post(selected_ticker, tweet_info['low_date_str'])
         logger.info("Process completed successfully.")
     else:
         logger.error("Failed to post tweet. Hype post history will not be updated.")
         sys.exit(1)
 
+def init_gallery_worker():
+    """Each gallery worker draws with its own headless matplotlib."""
+    import matplotlib
+    matplotlib.use("Agg")
+
+def render_gallery_chart(ticker, output_dir, used_posts):
+    """
+    Fetches, analyzes and charts one ticker for the gallery. Returns its index.json entry.
+    The gallery is not a posting decision: it always charts the ticker's significant low and only flags it as
+    'already_posted' when that (ticker, date) is in used_posts.
+    """
+    import indicators
+    entry = {"ticker": ticker, "path": None}
+    price_data = get_historical_data(ticker)
+    low_point = find_significant_low(price_data, ticker, set()) if price_data is not None else None
+    if low_point is None:
+        entry["error"] = "no price data" if price_data is None else "no significant low in the 1-4 year window"
+        return entry
+    indicator_df = indicators.compute_indicators({ticker: price_data})[ticker]
+    chart_path = create_hype_chart(ticker, price_data, low_point, "@AlphaIntel", indicator_df, os.path.join(output_dir, f"{ticker}.png"))
+    if not chart_path:
+        entry["error"] = "chart rendering failed"
+        return entry
+    current_price = float(price_data.iloc[-1]['Close'])
+    low_date = low_point.name.strftime('%Y-%m-%d')
+    entry.update({"path": chart_path, "low_date": low_date, "low_price": float(low_point['Low']), "already_posted": f"{ticker},{low_date}" in used_posts,
+                  "current_price": current_price, "roi": current_price / float(low_point['Low'])})
+    return entry
+
+def run_gallery(tickers, output_dir=GALLERY_DIR):
+    """Renders a chart per ticker in parallel worker processes and writes output_dir/index.json."""
+    os.makedirs(output_dir, exist_ok=True)
+    used_posts = load_processed_hype_posts()
+    logger.info(f"Rendering gallery of {len(tickers)} charts into '{output_dir}' with up to {GALLERY_WORKERS} workers...")
+    with ProcessPoolExecutor(max_workers=min(GALLERY_WORKERS, len(tickers)), initializer=init_gallery_worker) as pool:
+        futures = {ticker: pool.submit(render_gallery_chart, ticker, output_dir, used_posts) for ticker in tickers}
+    entries = []
+    for ticker, future in futures.items():
+        try: entries.append(future.result())
+        except Exception as e: entries.append({"ticker": ticker, "path": None, "error": str(e)})
+    with open(os.path.join(output_dir, "index.json"), 'w') as f:
+        json.dump({"generated_at": datetime.now().isoformat(timespec='seconds'), "charts": entries}, f, indent=2)
+    rendered = sum(1 for entry in entries if entry["path"])
+    logger.info(f"Gallery complete: {rendered}/{len(entries)} charts rendered. Index at '{os.path.join(output_dir, 'index.json')}'.")
+    return 0 if rendered else 1
+
 if __name__ == "__main__":
+    # --gallery [TICKER ...]: render a chart pack (every TICKER_MAP symbol by default) instead of posting.
+    if "--gallery" in sys.argv[1:]:
+        requested = [arg.upper() for arg in sys.argv[sys.argv.index("--gallery") + 1:] if not arg.startswith("--")]
+        sys.exit(run_gallery(requested or list(TICKER_MAP.values())))
     main()
@@ -1,95 +1,110 @@
-import matplotlib.pyplot as plt
+import sys
 import numpy as np
+import figure_cache
 
-plt.style.use('ggplot')
+# Figures are rendered through figure_cache: each one is only redrawn when its data, labels, style, size or DPI
+# (or the draw function itself) changed; unchanged figures are displayed from the cached PNG. Pass --no-show (or set
+# MPLBACKEND=Agg) to only write the PNGs.
+STYLE = 'ggplot'
+DPI = 100
 
 # Graphic 1: Tariff and Currency Offset
-def plot_tariff_offset():
+def tariff_offset_spec():
     base_price, tariff_rate, currency_offset = 100, 0.10, 0.10
-    prices = [base_price, base_price * (1 + tariff_rate), 
+    prices = [base_price, base_price * (1 + tariff_rate),
               base_price * (1 - currency_offset) * (1 + tariff_rate)]
     labels = ['No Tariff', 'Tariff, No Offset', 'Tariff with Offset']
-    
-    plt.figure(figsize=(8, 6))
-    bars = plt.bar(labels, prices, color=['#4CAF50', '#FF5733', '#3498DB'], edgecolor='black')
+    return {"prices": prices, "labels": labels, "colors": ['#4CAF50', '#FF5733', '#3498DB']}
+
+def draw_tariff_offset(plt, spec):
+    bars = plt.bar(spec["labels"], spec["prices"], color=spec["colors"], edgecolor='black')
     plt.title('Impact of Tariffs on Import Prices\n(10% Tariff on $100 Widget)', fontsize=14)
     plt.ylabel('Price in USD', fontsize=12)
     plt.ylim(0, 120)
     for bar in bars:
-        plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 2, f'${bar.get_height():.2f}', 
+        plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 2, f'${bar.get_height():.2f}',
                  ha='center', va='bottom', fontsize=10)
-    plt.text(0.5, 0.95, 'Currency Offset Reduces Price Impact\n(2018-2019 Example)', 
+    plt.text(0.5, 0.95, 'Currency Offset Reduces Price Impact\n(2018-2019 Example)',
              transform=plt.gca().transAxes, fontsize=10, ha='center', bbox=dict(facecolor='white', alpha=0.8))
     plt.tight_layout()
-    plt.savefig('tariff_offset.png')
-    plt.show()
+
+def plot_tariff_offset(show=True):
+    figure_cache.render('tariff_offset.png', draw_tariff_offset, tariff_offset_spec(), style=STYLE, figsize=(8, 6), dpi=DPI, show=show)
 
 # Graphic 2: Stock Market Scenarios (Updated with Steps vs. No Steps)
-def plot_stock_scenarios():
+def stock_scenarios_spec():
     time = np.arange(1, 6)  # April to August
     baseline = 507.075  # Today’s SPY close
     steps_taken = baseline * (1 + np.linspace(0, 0.10, 5))  # +10% by May with deal
     no_steps = baseline * (1 + np.linspace(0, -0.20, 5))  # -20% by May without action
-    
-    plt.figure(figsize=(10, 6))
-    plt.plot(time, steps_taken, label='Steps Taken (Mar-a-Lago Accord)', color='#4CAF50', lw=2)
-    plt.plot(time, no_steps, label='No Steps Taken', color='#FF5733', lw=2)
+    return {"time": time, "steps_taken": steps_taken, "no_steps": no_steps}
+
+def draw_stock_scenarios(plt, spec):
+    plt.plot(spec["time"], spec["steps_taken"], label='Steps Taken (Mar-a-Lago Accord)', color='#4CAF50', lw=2)
+    plt.plot(spec["time"], spec["no_steps"], label='No Steps Taken', color='#FF5733', lw=2)
     plt.title('S&P 500 Scenarios Post-Tariffs\n(April-May 2025 Prediction)', fontsize=14)
     plt.xlabel('Month (April=1)', fontsize=12)
     plt.ylabel('SPY Value ($)', fontsize=12)
     plt.legend(fontsize=10)
-    plt.text(0.5, 0.95, 'Steps Could Stabilize; Inaction Risks Decline', 
+    plt.text(0.5, 0.95, 'Steps Could Stabilize; Inaction Risks Decline',
              transform=plt.gca().transAxes, fontsize=10, ha='center', bbox=dict(facecolor='white', alpha=0.8))
     plt.tight_layout()
-    plt.savefig('stock_scenarios.png')
-    plt.show()
+
+def plot_stock_scenarios(show=True):
+    figure_cache.render('stock_scenarios.png', draw_stock_scenarios, stock_scenarios_spec(), style=STYLE, figsize=(10, 6), dpi=DPI, show=show)
 
 # Graphic 3: Sector Performance
-def plot_sector_performance():
+def sector_performance_spec():
     sectors = ['Manufacturing', 'Retail', 'Tech', 'Energy', 'Exporters']
     performance = [0, -10, -7, -7, -14]
-    
-    plt.figure(figsize=(10, 6))
-    bars = plt.bar(sectors, performance, color=['#4CAF50', '#FF5733', '#3498DB', '#FFC107', '#9C27B0'], 
+    return {"sectors": sectors, "performance": performance, "colors": ['#4CAF50', '#FF5733', '#3498DB', '#FFC107', '#9C27B0']}
+
+def draw_sector_performance(plt, spec):
+    bars = plt.bar(spec["sectors"], spec["performance"], color=spec["colors"],
                    edgecolor='black')
     plt.title('Sector Performance Under Tariff Scenario 3\n(Retaliation)', fontsize=14)
     plt.ylabel('Stock Price Change (%)', fontsize=12)
     plt.ylim(-10, 15)
     for bar in bars:
         yval = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2, yval + 0.5 if yval >= 0 else yval - 1, f'{yval}%', 
+        plt.text(bar.get_x() + bar.get_width()/2, yval + 0.5 if yval >= 0 else yval - 1, f'{yval}%',
                  ha='center', va='bottom' if yval >= 0 else 'top', fontsize=10)
-    plt.text(0.5, 0.95, 'Domestic Sectors Gain, Exporters Lag\nDue to Strong Dollar', 
+    plt.text(0.5, 0.95, 'Domestic Sectors Gain, Exporters Lag\nDue to Strong Dollar',
              transform=plt.gca().transAxes, fontsize=10, ha='center', bbox=dict(facecolor='white', alpha=0.8))
     plt.tight_layout()
-    plt.savefig('sector_performance.png')
-    plt.show()
+
+def plot_sector_performance(show=True):
+    figure_cache.render('sector_performance.png', draw_sector_performance, sector_performance_spec(), style=STYLE, figsize=(10, 6), dpi=DPI, show=show)
 
 # Bonus Graphic: Disney and Nvidia Predictions
-def plot_dis_nvda_predictions():
+def dis_nvda_predictions_spec():
     time = np.arange(1, 6)  # April to August
     dis_steps = [92.51, 95, 98, 100, 102.50]  # DIS with steps
     dis_no_steps = [92.51, 90, 88, 86, 85]  # DIS without steps
     nvda_steps = [114, 118, 122, 125, 127.50]  # NVDA with steps
     nvda_no_steps = [114, 110, 106, 103, 100]  # NVDA without steps
-    
-    plt.figure(figsize=(10, 6))
-    plt.plot(time, dis_steps, label='Disney (DIS) - Steps Taken', color='#FF5733', lw=2)
-    plt.plot(time, dis_no_steps, label='Disney (DIS) - No Steps', color='#FF5733', lw=2, linestyle='--')
-    plt.plot(time, nvda_steps, label='Nvidia (NVDA) - Steps Taken', color='#3498DB', lw=2)
-    plt.plot(time, nvda_no_steps, label='Nvidia (NVDA) - No Steps', color='#3498DB', lw=2, linestyle='--')
+    return {"time": time, "dis_steps": dis_steps, "dis_no_steps": dis_no_steps, "nvda_steps": nvda_steps, "nvda_no_steps": nvda_no_steps}
+
+def draw_dis_nvda_predictions(plt, spec):
+    time = spec["time"]
+    plt.plot(time, spec["dis_steps"], label='Disney (DIS) - Steps Taken', color='#FF5733', lw=2)
+    plt.plot(time, spec["dis_no_steps"], label='Disney (DIS) - No Steps', color='#FF5733', lw=2, linestyle='--')
+    plt.plot(time, spec["nvda_steps"], label='Nvidia (NVDA) - Steps Taken', color='#3498DB', lw=2)
+    plt.plot(time, spec["nvda_no_steps"], label='Nvidia (NVDA) - No Steps', color='#3498DB', lw=2, linestyle='--')
     plt.title('Disney & Nvidia Under Tariff Scenarios\n(April-May 2025 Prediction)', fontsize=14)
     plt.xlabel('Month (April=1)', fontsize=12)
     plt.ylabel('Stock Price ($)', fontsize=12)
     plt.legend(fontsize=10)
-    plt.text(0.5, 0.95, 'Steps vs. No Steps Impact', 
+    plt.text(0.5, 0.95, 'Steps vs. No Steps Impact',
              transform=plt.gca().transAxes, fontsize=10, ha='center', bbox=dict(facecolor='white', alpha=0.8))
     plt.tight_layout()
-    plt.savefig('dis_nvda_predictions.png')
-    plt.show()
+
+def plot_dis_nvda_predictions(show=True):
+    figure_cache.render('dis_nvda_predictions.png', draw_dis_nvda_predictions, dis_nvda_predictions_spec(), style=STYLE, figsize=(10, 6), dpi=DPI, show=show)
 
 if __name__ == "__main__":
-    plot_tariff_offset()
-    plot_stock_scenarios()
-    plot_sector_performance()
-    plot_dis_nvda_predictions()
+    show = figure_cache.should_show(sys.argv[1:])
+    plot_tariff_offset(show)
+    plot_stock_scenarios(show)
+    plot_sector_performance(show)
+    plot_dis_nvda_predictions(show)
@@ -0,0 +1,156 @@
+"""
+Single-pass dictionary matcher for coin names, symbols and social handles.
+
+All lexicon entries are folded into one regular expression shaped like a trie ("bitcoin cash" and "bitcoin"
+share the "bitcoin" prefix), so the compiled regex engine scans the text once and, at each position, only
+follows the characters that can still lead to an entry. Cost grows with the text, not with the lexicon size.
+
+Aliases written in UPPER CASE in the lexicon are ticker forms of ordinary words (ATOM, SOL, RUNE): they only match
+when the text has them in upper case too, so "atom smashers" is not a coin mention. '$'-prefixed forms match in any case.
+
+Usage:
+  python entity_matcher.py build-lexicon    # regenerate coin_lexicon.csv from the CryptoCompare coin list
+"""
+import csv
+import logging
+import os
+import re
+import sys
+
+logger = logging.getLogger(__name__)
+
+LEXICON_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "coin_lexicon.csv")
+COIN_LIST_URL = "https://min-api.cryptocompare.com/data/all/coinlist"
+DICTIONARY_FILE = "/usr/share/dict/words"  # Used by build-lexicon when present, on top of COMMON_WORDS
+MIN_NAME_LENGTH = 3
+MIN_CASELESS_SYMBOL_LENGTH = 3  # Shorter symbols are always ticker forms
+# Ordinary words that are also coin names or symbols; build-lexicon writes them as upper-case ticker forms.
+COMMON_WORDS = {
+    "ace", "act", "ada", "aid", "air", "algo", "alpha", "ant", "ape", "arc", "ark", "art", "atom", "auto", "base",
+    "bat", "beam", "bear", "bee", "best", "bet", "big", "bit", "blue", "blur", "bond", "bonk", "boo", "book", "box",
+    "bull", "burger", "bus", "buy", "cake", "car", "cash", "cat", "chain", "city", "coin", "cow", "cut", "data", "dent",
+    "dog", "dot", "drop", "ease", "echo", "edge", "ego", "elf", "ether", "eye", "fan", "fast", "fire", "fish", "flow",
+    "fox", "frog", "fun", "game", "gas", "gem", "get", "gift", "god", "gold", "good", "grow", "hard", "hero",
+    "high", "hive", "hold", "home", "hot", "hype", "ice", "joe", "just", "key", "kava", "kind", "king", "lido", "life",
+    "lift", "like", "link", "lion", "live", "loom", "love", "luna", "magic", "mana", "map", "mask", "max", "meme", "mint",
+    "moon", "more", "near", "neo", "net", "new", "next", "now", "oil", "one", "open", "orb", "pay", "pepe", "pit",
+    "play", "pol", "pond", "pop", "pro", "pump", "quick", "rain", "ray", "real", "red", "ride", "rise", "rock", "rose",
+    "rune", "safe", "sand", "save", "sea", "ship", "sky", "smart", "snow", "sol", "son", "soul", "spell", "star",
+    "stellar", "sun", "super", "sushi", "swap", "tea", "terra", "time", "top", "tree", "true", "turbo", "vet",
+    "vote", "wave", "wax", "web", "well", "win", "wing", "wolf", "wood", "yes", "you", "zero",
+}
+
+def load_lexicon(path=LEXICON_FILE):
+    """Reads 'alias,symbol' rows (lines starting with # are comments). Returns {alias: symbol}, aliases in their file case."""
+    if not os.path.exists(path):
+        logger.warning(f"Lexicon file '{path}' not found. Falling back to the built-in ticker map.")
+        return {}
+    lexicon = {}
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.reader(f):
+            if len(row) < 2 or row[0].startswith('#'): continue
+            alias, symbol = row[0].strip(), row[1].strip()
+            if alias and symbol: lexicon[alias] = symbol
+    return lexicon
+
+def _trie_regex(node):
+    """Turns a character trie ({char: subtrie}, '' marks a word end) into a prefix-factored regex fragment."""
+    is_end = '' in node
+    branches = [re.escape(char) + _trie_regex(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if is_end:
+        # Greedy optional: longer entries ("binance coin") win over their prefixes ("binance").
+        return '(?:' + body + ')?'
+    return body
+
+def ticker_forms(lexicon):
+    """The upper-case (ticker form) aliases of a lexicon, to pass to build_matcher."""
+    return {alias for alias in lexicon if alias.isupper()}
+
+def build_matcher(lexicon, ticker_only=()):
+    """
+    Compiles {surface form: value} into a case-insensitive whole-word matcher. Entries in ticker_only only match
+    when written in upper case or right after a '$', unless the lexicon also has a plain (caseless) form of the alias.
+    """
+    lookup = {alias.lower(): value for alias, value in lexicon.items()}
+    caseless = {alias.lower() for alias in lexicon if alias not in ticker_only}
+    trie = {}
+    for alias in lookup:
+        node = trie
+        for char in alias:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    # Lookarounds instead of \b so entries that start or end with punctuation ("$btc") still need whole-word context.
+    pattern = r'(?<!\w)' + _trie_regex(trie) + r'(?!\w)' if lookup else r'(?!x)x'
+    return {"regex": re.compile(pattern, re.IGNORECASE), "lookup": lookup,
+            "upper_only": {alias.lower() for alias in ticker_only} - caseless}
+
+def find_entities(matcher, text):
+    """Returns [(start, end, value)] for every non-overlapping entry in text, in order of appearance."""
+    matches = []
+    for match in matcher["regex"].finditer(text):
+        surface = match.group(0)
+        if surface.lower() in matcher["upper_only"] and surface != surface.upper() and text[match.start() - 1:match.start()] != '$':
+            continue
+        value = matcher["lookup"].get(surface.lower())
+        if value is not None:
+            matches.append((match.start(), match.end(), value))
+    return matches
+
+def _common_words():
+    words = set(COMMON_WORDS)
+    if os.path.exists(DICTIONARY_FILE):
+        with open(DICTIONARY_FILE, 'r', encoding='utf-8', errors='ignore') as f:
+            words.update(line.strip().lower() for line in f if line.strip().isalpha())
+    return words
+
+def lexicon_from_coin_list(coins, common_words, curated=None):
+    """
+    Builds {alias: symbol} from CryptoCompare coin list entries ({'Symbol', 'CoinName', 'SortOrder', ...}).
+    Names and symbols that are ordinary words (or symbols shorter than MIN_CASELESS_SYMBOL_LENGTH) become upper-case
+    ticker forms; '$symbol' is always added. When an alias is shared, the coin with the lowest SortOrder (the longest
+    listed) keeps it, and curated entries win over all of them.
+    """
+    lexicon = {}
+    def add(alias, symbol):
+        if alias.lower() not in seen: seen.add(alias.lower()); lexicon[alias] = symbol
+    seen = set()
+    for alias, symbol in (curated or {}).items(): add(alias, symbol)
+    for coin in sorted(coins, key=lambda c: int(c.get("SortOrder") or 10 ** 9)):
+        symbol = (coin.get("Symbol") or "").strip().upper(); name = re.sub(r'\s+', ' ', (coin.get("CoinName") or "").strip().lower())
+        if not re.fullmatch(r'[A-Z0-9]{2,10}', symbol): continue
+        add(f"${symbol.lower()}", symbol)
+        if len(symbol) < MIN_CASELESS_SYMBOL_LENGTH or symbol.lower() in common_words: add(symbol, symbol)
+        else: add(symbol.lower(), symbol)
+        if len(name) >= MIN_NAME_LENGTH and name != symbol.lower() and not name.isdigit():
+            add(name.upper() if name in common_words else name, symbol)
+    return lexicon
+
+def save_lexicon(lexicon, path=LEXICON_FILE):
+    with open(path + ".part", 'w', encoding='utf-8', newline='') as f:
+        f.write("# alias,symbol\n# Matched as whole words by entity_matcher.py: case-insensitively, except UPPER CASE aliases (ticker forms\n"
+                "# of ordinary words), which only match upper case text. Regenerate with `python entity_matcher.py build-lexicon`.\n")
+        csv.writer(f, lineterminator='\n').writerows(lexicon.items())
+    os.replace(path + ".part", path)
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(filename)s] - %(message)s')
+    if argv[:1] != ["build-lexicon"]:
+        print(__doc__)
+        return 2
+    import http_client
+    response = http_client.get(COIN_LIST_URL); response.raise_for_status()
+    coins = (response.json().get("Data") or {}).values()
+    if not coins:
+        logger.error("The coin list came back empty. Lexicon not written.")
+        return 1
+    # Entries already in the file stay authoritative, so hand-added aliases ("xbt", "sats") survive a rebuild.
+    lexicon = lexicon_from_coin_list(coins, _common_words(), curated=load_lexicon())
+    save_lexicon(lexicon)
+    logger.info(f"Wrote {len(lexicon)} aliases for {len(coins)} listed coins to '{LEXICON_FILE}'.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,97 @@
+"""
+Content-addressed cache for rendered matplotlib figures.
+
+A figure is described by a draw function and a spec (its data arrays, labels, colors, ...). The cache key is a
+hash of the spec, the draw function's source, the style, the figure size and the DPI, so a figure is redrawn
+only when something that affects its pixels changed. Cache hits copy the stored PNG into place without
+importing matplotlib, or display that PNG when the figure is also to be shown. The cache directory is kept under MAX_CACHE_BYTES by evicting least recently used files.
+"""
+import hashlib
+import inspect
+import logging
+import os
+import shutil
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "figure_cache")
+MAX_CACHE_BYTES = 50 * 1024 * 1024
+DEFAULT_FIGSIZE = (6.4, 4.8)  # matplotlib's defaults, so figures that never set them keep their look
+DEFAULT_DPI = 100
+NON_INTERACTIVE_BACKENDS = {"agg", "cairo", "pdf", "pgf", "ps", "svg", "template"}
+
+def should_show(argv):
+    """
+    Scripts display their figures unless run with --no-show or under a non-interactive MPLBACKEND (e.g. Agg on a
+    headless box). Shown figures still come from the cache; --no-show also skips importing matplotlib on a hit.
+    """
+    return "--no-show" not in argv and os.environ.get("MPLBACKEND", "").lower() not in NON_INTERACTIVE_BACKENDS
+
+def _feed(digest, value):
+    """Hashes nested dicts/lists/tuples, strings, numbers and numpy arrays in a type-tagged, order-stable way."""
+    if isinstance(value, dict):
+        digest.update(b'd%d' % len(value))
+        for key in sorted(value, key=str):
+            _feed(digest, str(key)); _feed(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(b'l%d' % len(value))
+        for item in value: _feed(digest, item)
+    elif hasattr(value, 'dtype') and hasattr(value, 'tobytes'):  # numpy array or scalar, without importing numpy here
+        digest.update(f"a{value.dtype.str}{getattr(value, 'shape', ())}".encode())
+        digest.update(value.tobytes())
+    else:
+        digest.update(f"{type(value).__name__}:{value!r}".encode('utf-8'))
+
+def figure_key(draw, spec, style, figsize, dpi):
+    digest = hashlib.sha256()
+    _feed(digest, [inspect.getsource(draw), spec, style, list(figsize), dpi])
+    return digest.hexdigest()[:24]
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Deletes least recently used cache entries until the directory fits in max_bytes."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.endswith('.png') and os.path.isfile(path):
+            stat = os.stat(path); entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes: break
+        os.remove(path); total -= size
+        logger.info(f"Evicted cached figure '{path}'.")
+
+def _show_png(path, dpi):
+    """Displays a saved PNG in a window of the size it was rendered at, without axes, so it looks like the original figure."""
+    import matplotlib.pyplot as plt
+    image = plt.imread(path)
+    fig = plt.figure(figsize=(image.shape[1] / dpi, image.shape[0] / dpi), dpi=dpi)
+    ax = fig.add_axes([0, 0, 1, 1]); ax.imshow(image); ax.set_axis_off()
+    plt.show()
+    plt.close(fig)
+
+def render(output_path, draw, spec, style='default', figsize=DEFAULT_FIGSIZE, dpi=DEFAULT_DPI, show=False, cache_dir=CACHE_DIR):
+    """
+    Writes the figure drawn by draw(plt, spec) to output_path, reusing a cached render when nothing changed.
+    draw works on the current pyplot figure. With show=True the figure is displayed; on a cache hit that is the
+    cached PNG itself, shown at its native size, rather than a redraw. Returns True on a cache hit.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    cached_path = os.path.join(cache_dir, figure_key(draw, spec, style, figsize, dpi) + '.png')
+    if os.path.exists(cached_path):
+        shutil.copyfile(cached_path, output_path)
+        os.utime(cached_path)  # Marks it recently used for eviction
+        logger.info(f"'{output_path}' unchanged; reused cached render.")
+        if show: _show_png(output_path, dpi)
+        return True
+
+    import matplotlib.pyplot as plt
+    with plt.style.context(style):
+        fig = plt.figure(figsize=figsize, dpi=dpi)
+        draw(plt, spec)
+        fig.savefig(output_path, dpi=dpi)
+    shutil.copyfile(output_path, cached_path + '.part'); os.replace(cached_path + '.part', cached_path)
+    logger.info(f"Rendered '{output_path}' and cached it.")
+    if show: plt.show()
+    plt.close(fig)
+    evict(cache_dir)
+    return False
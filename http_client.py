@@ -0,0 +1,137 @@
+"""
+Shared HTTP client for the scripts: pooled keep-alive sessions, bounded retries and an on-disk response cache.
+
+get() sends a request through a per-host requests.Session whose adapter keeps connections alive and retries
+connection errors and 429/5xx responses with exponential backoff plus jitter (honoring Retry-After, capped at
+MAX_RETRY_AFTER_SECONDS so a server asking for an hour cannot stall a run past its deadline).
+cached_get() adds an HTTP cache for feeds and API responses: a response still fresh under its max-age (or
+Expires) is served from disk without a request; otherwise the stored ETag / Last-Modified are sent as
+If-None-Match / If-Modified-Since, and a 304 reuses the stored body. Both return requests.Response objects;
+cached ones have from_cache = True.
+"""
+import email.utils
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_DIR = "http_cache"
+DEFAULT_TIMEOUT = (5, 20)  # (connect, read) seconds
+POOL_SIZE = 4  # Keep-alive connections per host
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 0.5  # Sleeps 0.5 s, 1 s, 2 s between attempts ...
+RETRY_BACKOFF_JITTER = 0.5  # ... plus up to this many random seconds, so parallel runs do not retry in lockstep
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRY_AFTER_SECONDS = 10  # Longest Retry-After sleep per attempt; longer requests are cut to this
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control", "Expires", "Date")
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+class CappedRetry(Retry):
+    """Retry whose Retry-After sleeps are clamped to MAX_RETRY_AFTER_SECONDS."""
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, MAX_RETRY_AFTER_SECONDS)
+
+def _retry_policy():
+    options = dict(total=RETRY_TOTAL, backoff_factor=RETRY_BACKOFF_FACTOR, status_forcelist=RETRY_STATUSES,
+                   allowed_methods=frozenset({"GET", "HEAD"}), respect_retry_after_header=True, raise_on_status=False)
+    try: return CappedRetry(backoff_jitter=RETRY_BACKOFF_JITTER, **options)
+    except TypeError: return CappedRetry(**options)  # urllib3 < 2 has no jitter option
+
+def session_for(url):
+    """The pooled session for url's scheme and host, created on first use."""
+    parts = urlsplit(url); key = f"{parts.scheme}://{parts.netloc}"
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            session.mount(key, HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=_retry_policy()))
+            _sessions[key] = session
+        return session
+
+def get(url, params=None, headers=None, timeout=DEFAULT_TIMEOUT, stream=False):
+    """GET through the host's pooled, retrying session (no caching; use for downloads and non-repeatable endpoints)."""
+    return session_for(url).get(url, params=params, headers=headers, timeout=timeout, stream=stream)
+
+def _cache_paths(url, params, cache_dir):
+    key = hashlib.sha256(json.dumps([url, sorted((params or {}).items())], default=str).encode('utf-8')).hexdigest()[:32]
+    return os.path.join(cache_dir, f"{key}.json"), os.path.join(cache_dir, f"{key}.body")
+
+def _freshness_seconds(headers):
+    """Seconds a response may be reused without revalidation; None means it must not be stored."""
+    cache_control = headers.get("Cache-Control", "").lower()
+    if "no-store" in cache_control: return None
+    if "no-cache" in cache_control: return 0
+    match = re.search(r'max-age=(\d+)', cache_control)
+    if match: return int(match.group(1))
+    if headers.get("Expires"):
+        try: return max(0, int(email.utils.parsedate_to_datetime(headers["Expires"]).timestamp() - time.time()))
+        except (TypeError, ValueError): return 0
+    return 0
+
+def _varies_on(response, headers):
+    """True if the response declares (via Vary) that it depends on '*' or on one of the request headers we chose."""
+    vary = {name.strip().lower() for name in response.headers.get("Vary", "").split(",") if name.strip()}
+    return "*" in vary or bool(vary & {name.lower() for name in headers or {}})
+
+def _cached_response(url, meta, body):
+    response = requests.Response()
+    response.status_code, response.reason, response.url, response._content = 200, "OK", url, body
+    response.headers = CaseInsensitiveDict(meta["headers"])
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.from_cache = True
+    return response
+
+def cached_get(url, params=None, headers=None, timeout=DEFAULT_TIMEOUT, cache_dir=HTTP_CACHE_DIR):
+    """
+    GET with an on-disk HTTP cache honoring max-age/Expires, ETag and Last-Modified. Only 200 responses are stored,
+    and not those that Vary on a header passed in `headers` (the cache is keyed on url and params only).
+    """
+    meta_path, body_path = _cache_paths(url, params, cache_dir)
+    meta = None
+    if os.path.exists(meta_path) and os.path.exists(body_path):
+        try:
+            with open(meta_path, 'r') as f: meta = json.load(f)
+        except (OSError, ValueError): meta = None
+    if meta and time.time() - meta["stored_at"] < meta["fresh_for"]:
+        with open(body_path, 'rb') as f: return _cached_response(url, meta, f.read())
+
+    request_headers = dict(headers or {})
+    if meta:
+        if meta["headers"].get("ETag"): request_headers["If-None-Match"] = meta["headers"]["ETag"]
+        if meta["headers"].get("Last-Modified"): request_headers["If-Modified-Since"] = meta["headers"]["Last-Modified"]
+    response = get(url, params=params, headers=request_headers, timeout=timeout)
+    response.from_cache = False
+
+    if response.status_code == 304 and meta:
+        fresh_for = _freshness_seconds(response.headers)
+        meta.update(stored_at=time.time(), fresh_for=fresh_for if fresh_for is not None else meta["fresh_for"])
+        with open(meta_path, 'w') as f: json.dump(meta, f)
+        logger.debug(f"HTTP cache revalidated (304): {url}")
+        with open(body_path, 'rb') as f: return _cached_response(url, meta, f.read())
+
+    fresh_for = _freshness_seconds(response.headers)
+    has_validators = "ETag" in response.headers or "Last-Modified" in response.headers
+    if response.status_code == 200 and fresh_for is not None and (fresh_for > 0 or has_validators) and not _varies_on(response, headers):
+        os.makedirs(cache_dir, exist_ok=True)
+        meta = {"url": url, "stored_at": time.time(), "fresh_for": fresh_for,
+                "headers": {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}}
+        # Each file is replaced atomically, so a crash never leaves a truncated body behind.
+        with open(body_path + ".part", 'wb') as f: f.write(response.content)
+        os.replace(body_path + ".part", body_path)
+        with open(meta_path + ".part", 'w') as f: json.dump(meta, f)
+        os.replace(meta_path + ".part", meta_path)
+    return response
@@ -0,0 +1,115 @@
+"""
+Vectorized technical indicators over the price DataFrames returned by chart_3.get_historical_data.
+
+All tickers are stacked into one date-aligned (days x tickers) array and every indicator is computed
+for the whole universe at once with array operations along the time axis.
+"""
+import numpy as np
+import pandas as pd
+
+SMA_WINDOWS = (50, 200)
+EMA_SPANS = (21,)
+RSI_PERIOD = 14
+VOLATILITY_WINDOW = 30
+PERIODS_PER_YEAR = 365  # Crypto trades every day.
+# Indicators drawn over the candles by indicator_addplots().
+PRICE_OVERLAYS = {"SMA_50": "#f5c542", "SMA_200": "#4da6ff"}
+
+def align_closes(price_frames, column='Close'):
+    """Stacks one column of several per-ticker DataFrames into a date-aligned (days x tickers) DataFrame."""
+    return pd.concat({ticker: df[column] for ticker, df in price_frames.items()}, axis=1).sort_index()
+
+def fetch_price_frames(tickers=None, fetch=None):
+    """
+    Fetches each ticker (default: every chart_3.TICKER_MAP symbol) with fetch (default: chart_3.get_historical_data)
+    and returns {ticker: DataFrame} for the ones that returned data.
+    """
+    if tickers is None or fetch is None:
+        import chart_3  # Only the build commands need the network client and its dependencies
+        tickers = chart_3.TICKER_MAP.values() if tickers is None else tickers
+        fetch = chart_3.get_historical_data if fetch is None else fetch
+    price_frames = {}
+    for ticker in tickers:
+        price_df = fetch(ticker)
+        if price_df is not None:
+            price_frames[ticker] = price_df
+    return price_frames
+
+def rolling_mean(values, window):
+    """NaN-aware rolling mean along axis 0 using cumulative sums. Windows containing a NaN yield NaN."""
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    sums = np.vstack([np.zeros((1, values.shape[1])), sums])
+    counts = np.vstack([np.zeros((1, values.shape[1]), dtype=counts.dtype), counts])
+    out = np.full(values.shape, np.nan)
+    if window <= values.shape[0]:
+        window_sums = sums[window:] - sums[:-window]
+        full = (counts[window:] - counts[:-window]) == window
+        out[window - 1:] = np.where(full, window_sums / window, np.nan)
+    return out
+
+def rolling_std(values, window):
+    """NaN-aware rolling sample standard deviation along axis 0."""
+    mean = rolling_mean(values, window)
+    mean_sq = rolling_mean(values * values, window)
+    variance = np.clip(mean_sq - mean * mean, 0.0, None) * window / (window - 1)
+    return np.sqrt(variance)
+
+def ewm_mean(values, **ewm_kwargs):
+    """Exponentially weighted mean of every column at once (pandas' compiled ewm, no per-ticker loop)."""
+    return pd.DataFrame(values).ewm(adjust=False, **ewm_kwargs).mean().to_numpy()
+
+def rsi(close, period=RSI_PERIOD):
+    """Wilder's RSI for every column."""
+    delta = np.diff(close, axis=0, prepend=np.nan)
+    gains = np.where(np.isnan(delta), np.nan, np.clip(delta, 0.0, None))
+    losses = np.where(np.isnan(delta), np.nan, np.clip(-delta, 0.0, None))
+    avg_gain = ewm_mean(gains, alpha=1.0 / period, min_periods=period)
+    avg_loss = ewm_mean(losses, alpha=1.0 / period, min_periods=period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return np.where(avg_loss == 0, 100.0, out)
+
+def drawdowns(close):
+    """Returns (distance from the running all-time high, running maximum drawdown), both as negative fractions."""
+    running_high = np.fmax.accumulate(close, axis=0)
+    ath_distance = close / running_high - 1.0
+    return ath_distance, np.fmin.accumulate(ath_distance, axis=0)
+
+def compute_indicators(price_frames):
+    """
+    Computes SMA, EMA, RSI, annualized rolling volatility, ATH distance and max drawdown for every ticker in one pass.
+    price_frames maps ticker -> price DataFrame. Returns ticker -> float32 indicator DataFrame on that ticker's index.
+    """
+    closes = align_closes(price_frames)
+    close = closes.to_numpy(dtype=np.float64)
+    log_returns = np.diff(np.log(close), axis=0, prepend=np.nan)
+    ath_distance, max_drawdown = drawdowns(close)
+
+    results = {f"SMA_{w}": rolling_mean(close, w) for w in SMA_WINDOWS}
+    results.update({f"EMA_{s}": ewm_mean(close, span=s, min_periods=s) for s in EMA_SPANS})
+    results[f"RSI_{RSI_PERIOD}"] = rsi(close)
+    results[f"VOL_{VOLATILITY_WINDOW}"] = rolling_std(log_returns, VOLATILITY_WINDOW) * np.sqrt(PERIODS_PER_YEAR)
+    results["ATH_DIST"] = ath_distance
+    results["MAX_DD"] = max_drawdown
+
+    # One (days x tickers x indicators) block, then a cheap per-ticker view back onto each ticker's own dates.
+    stacked = np.stack(list(results.values()), axis=2).astype(np.float32)
+    columns = list(results)
+    return {
+        ticker: pd.DataFrame(stacked[:, i, :], index=closes.index, columns=columns).reindex(price_frames[ticker].index)
+        for i, ticker in enumerate(closes.columns)
+    }
+
+def indicator_addplots(indicator_df, overlays=PRICE_OVERLAYS, rsi_panel=None):
+    """Builds mpf.make_addplot overlays for the rows of indicator_df (already sliced to the plotted range)."""
+    import mplfinance as mpf
+    addplots = []
+    for column, color in overlays.items():
+        if column in indicator_df and indicator_df[column].notna().any():
+            addplots.append(mpf.make_addplot(indicator_df[column], color=color, width=1.2))
+    rsi_column = f"RSI_{RSI_PERIOD}"
+    if rsi_panel is not None and indicator_df[rsi_column].notna().any():
+        addplots.append(mpf.make_addplot(indicator_df[rsi_column], panel=rsi_panel, color='#c39bd3', ylim=(0, 100), ylabel='RSI'))
+    return addplots
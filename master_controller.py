@@ -1,15 +1,23 @@
+import os
 import time
 import random
 import subprocess
 import logging
 import sys
+import resource
 from datetime import datetime, timedelta
 import pytz  # Required for timezone handling
+import run_metrics
+import supervisor
+import resource_limits
 
 # --- CONFIGURATION ---
 # All settings are now in a single dictionary for easier management.
 CONFIG = {
     # File containing the list of scripts to run (one per line).
+    # Optional resource limits may follow the script name, e.g.:
+    #   news.py cpu=240 mem=2G nice=10 cgroup_mem=3G cgroup_cpu=150
+    # See resource_limits.py for what each limit means.
     "SCRIPTS_CONFIG_FILE": "scripts_to_run.txt",
 
     # --- Human Behavior Settings ---
@@ -34,6 +42,23 @@ CONFIG = {
     # Long wait time used during "quiet hours" (e.g., overnight).
     "MIN_WAIT_QUIET_HOURS_MINUTES": 20,
     "MAX_WAIT_QUIET_HOURS_MINUTES": 45,
+
+    # --- Run Metrics ---
+    # Every script run is recorded here. View with: python run_metrics.py --since 24h
+    "METRICS_DB_FILE": "run_metrics.db",
+    "SCRIPT_TIMEOUT_SECONDS": 300,
+    # Scripts receive RUN_DEADLINE_EPOCH (Unix time) this many seconds before the timeout, so deadline-aware
+    # scripts (news.py) can degrade and still exit cleanly instead of being killed.
+    "DEADLINE_MARGIN_SECONDS": 15,
+
+    # --- Child Output ---
+    # Script output is streamed into size-capped rotating files here (one per script).
+    "LOG_DIR": "logs",
+
+    # --- Resource Limits ---
+    # Parent cgroup v2 directory for per-script slices (cgroup_mem / cgroup_cpu limits).
+    # It must exist and be writable by this user; otherwise only rlimits and nice are applied.
+    "CGROUP_PARENT": "/sys/fs/cgroup/master_controller",
 }
 
 # --- SCRIPT ---
@@ -41,10 +66,18 @@ CONFIG = {
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [Controller] - %(message)s')
 
 def get_scripts_to_run():
-    """Reads the list of scripts from the configuration file."""
+    """Reads the list of scripts, and any per-script resource limits, from the configuration file."""
     try:
+        scripts = []
         with open(CONFIG["SCRIPTS_CONFIG_FILE"], 'r') as f:
-            scripts = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+            for line in f:
+                if not line.strip() or line.startswith('#'): continue
+                name, *limit_tokens = line.split()
+                try:
+                    scripts.append({"name": name, "limits": resource_limits.parse_limits(limit_tokens)})
+                except ValueError as e:
+                    logging.error(f"Ignoring invalid limits for '{name}': {e}")
+                    scripts.append({"name": name, "limits": {}})
         if not scripts:
             logging.warning(f"'{CONFIG['SCRIPTS_CONFIG_FILE']}' is empty. No scripts to run.")
         return scripts
@@ -52,26 +85,61 @@ def get_scripts_to_run():
         logging.critical(f"FATAL: Config file '{CONFIG['SCRIPTS_CONFIG_FILE']}' not found. Please create it.")
         sys.exit(1)
 
-def run_script(script_name):
-    """Executes a single script, returns True on success, False on failure."""
+def run_script(script):
+    """Executes a single script under its resource limits, records its run metrics, returns True on success, False on failure."""
+    script_name, limits = script["name"], script["limits"]
     logging.info(f"--- Starting run of '{script_name}' ---")
+    run = {"script": script_name, "started_at": time.time(), "exit_code": None, "timed_out": False, "status": "failed", "limit_breach": None,
+           "max_rss_kb": None}
+    cgroup_path = resource_limits.prepare_cgroup(CONFIG["CGROUP_PARENT"], script_name, limits)
+    oom_kills_before = resource_limits.read_oom_kills(cgroup_path)
+    memory_peak = resource_limits.open_memory_peak(cgroup_path)
+    usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.monotonic()
+    deadline = run["started_at"] + CONFIG["SCRIPT_TIMEOUT_SECONDS"] - CONFIG["DEADLINE_MARGIN_SECONDS"]
     try:
-        subprocess.run(
-            [sys.executable, script_name],
-            check=True, capture_output=True, text=True, timeout=300 # 5-minute timeout
-        )
-        logging.info(f"'{script_name}' completed successfully.")
-        return True
+        result = supervisor.run_supervised([sys.executable, script_name], script_name, CONFIG["SCRIPT_TIMEOUT_SECONDS"], CONFIG["LOG_DIR"],
+                                           preexec_fn=resource_limits.make_preexec_fn(limits, cgroup_path),
+                                           env=dict(os.environ, RUN_DEADLINE_EPOCH=f"{deadline:.0f}"))
+        # The slice's memory.peak, when it can be reset per run, sees every process of the run without sampling gaps.
+        peaks = [peak for peak in (result["max_rss_kb"], resource_limits.read_memory_peak_kb(memory_peak)) if peak is not None]
+        run.update(exit_code=result["exit_code"], timed_out=result["timed_out"], max_rss_kb=max(peaks) if peaks else None)
+        breach = None
+        if not result["interrupted"] and not result["timed_out"]:
+            breach = resource_limits.detect_breach(limits, result["exit_code"], result["stderr_tail"],
+                                                   resource_limits.read_oom_kills(cgroup_path) - oom_kills_before)
+        if result["interrupted"]:
+            run["status"] = "interrupted"
+            logging.warning(f"'{script_name}' was stopped by a signal.")
+        elif result["timed_out"]:
+            run["status"] = "timeout"
+            logging.error(f"'{script_name}' timed out after {CONFIG['SCRIPT_TIMEOUT_SECONDS']} seconds. Skipping.")
+        elif breach:
+            run.update(status="limit_exceeded", limit_breach=breach)
+            logging.error(f"'{script_name}' was stopped by its '{breach}' resource limit ({limits}). Full output: {result['log_path']}")
+        elif result["exit_code"] == 0:
+            run["status"] = "ok"
+            logging.info(f"'{script_name}' completed successfully.")
+        else:
+            logging.error(f"'{script_name}' failed with an error (exit code {result['exit_code']}). Full output: {result['log_path']}")
+            logging.error(f"--- Last error output from '{script_name}' ---\n" + "\n".join(result["stderr_tail"]))
     except FileNotFoundError:
+        run["status"] = "not_found"
         logging.error(f"Could not find '{script_name}'. Skipping.")
-        return False
-    except subprocess.CalledProcessError as e:
-        logging.error(f"'{script_name}' failed with an error.")
-        logging.error(f"--- Error output from '{script_name}' ---\n" + e.stderr.strip())
-        return False
-    except subprocess.TimeoutExpired:
-        logging.error(f"'{script_name}' timed out after 5 minutes. Skipping.")
-        return False
+    except subprocess.SubprocessError as e:
+        # Raised when preexec_fn (rlimits, nice, cgroup placement) fails in the child.
+        logging.error(f"Could not launch '{script_name}' with its resource limits: {e}")
+    finally:
+        run["wall_seconds"] = time.monotonic() - start
+        usage_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        run["user_cpu_seconds"] = usage_after.ru_utime - usage_before.ru_utime
+        run["sys_cpu_seconds"] = usage_after.ru_stime - usage_before.ru_stime
+        if memory_peak is not None: memory_peak.close()  # Already closed unless the launch failed
+        run_metrics.record_run(run, CONFIG["METRICS_DB_FILE"])
+    logging.info(f"'{script_name}' took {run['wall_seconds']:.1f}s wall, {run['user_cpu_seconds'] + run['sys_cpu_seconds']:.1f}s CPU.")
+    if run["status"] == "interrupted":
+        raise KeyboardInterrupt
+    return run["status"] == "ok"
 
 def get_current_time():
     """Returns the current time in the configured timezone."""
@@ -121,6 +189,7 @@ def calculate_dynamic_wait(posts_today, daily_target):
 
 if __name__ == "__main__":
     logging.info(f"Master Controller started. Timezone: {CONFIG['TIMEZONE']}. Press Ctrl+C to stop.")
+    supervisor.install_status_handler()
     
     posts_today = 0
     current_day = get_current_time().date()
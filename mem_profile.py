@@ -0,0 +1,129 @@
+"""
+Opt-in memory profiling for the media pipelines.
+
+Enable with PIPELINE_MEMPROFILE=1 or the --memprofile flag. Each `with stage("name"):` block then records:
+  peak / retained  Python allocations (tracemalloc) at the block's high-water mark and still alive after it
+  top sites        the source lines whose allocations grew the most across the block
+  rss              process max RSS, which also covers native buffers tracemalloc cannot see (PIL images, ffmpeg I/O)
+  fds              open file descriptors after the block and how many the block leaked
+  child peak       highest combined RSS of child processes (ffmpeg, chromium, ...) seen while the block ran,
+                   sampled every CHILD_SAMPLE_SECONDS by a background thread
+A report is printed to stderr at exit and, if PIPELINE_MEMPROFILE_FILE is set, written there as JSON.
+When profiling is off, stage() does nothing.
+"""
+import atexit
+import contextlib
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+ENABLED = os.environ.get("PIPELINE_MEMPROFILE") == "1" or "--memprofile" in sys.argv[1:]
+REPORT_FILE = os.environ.get("PIPELINE_MEMPROFILE_FILE")
+TOP_SITES = 5
+TRACEBACK_FRAMES = 1
+CHILD_SAMPLE_SECONDS = 0.1
+
+_stages = []
+_stack = []  # [[name, peak of finished nested stages]]
+
+def _open_fds():
+    try: return len(os.listdir('/proc/self/fd'))
+    except OSError: return None
+
+def _descendant_pids(pid='self'):
+    pids, pending = set(), [pid]
+    while pending:
+        parent = pending.pop()
+        try: tasks = os.listdir(f'/proc/{parent}/task')
+        except OSError: continue
+        for task in tasks:
+            try:
+                with open(f'/proc/{parent}/task/{task}/children') as f: found = set(f.read().split()) - pids
+            except OSError: continue
+            pids |= found; pending.extend(found)
+    return pids
+
+def _children_rss_kb():
+    """Sum of VmRSS over all descendant processes in KB, or None without /proc."""
+    if not os.path.exists('/proc/self/task'): return None
+    total = 0
+    for pid in _descendant_pids():
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                total += next((int(line.split()[1]) for line in f if line.startswith('VmRSS:')), 0)
+        except (OSError, ValueError): continue
+    return total
+
+class _ChildSampler(threading.Thread):
+    """Polls the combined RSS of child processes while a stage runs; children that start and exit within it are caught."""
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak_kb, self.stopped = _children_rss_kb(), threading.Event()
+    def run(self):
+        while not self.stopped.wait(CHILD_SAMPLE_SECONDS):
+            rss = _children_rss_kb()
+            if rss is not None: self.peak_kb = max(rss, self.peak_kb or 0)
+    def stop(self):
+        self.stopped.set(); self.join()
+        return self.peak_kb
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__),
+                                                   tracemalloc.Filter(False, threading.__file__)])  # The child sampler's own churn
+
+@contextlib.contextmanager
+def stage(name):
+    """Profiles the enclosed block as one pipeline stage (no-op unless profiling is enabled)."""
+    if not ENABLED:
+        yield; return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEBACK_FRAMES)
+        atexit.register(report)
+    if _stack:  # The parent's peak so far must survive the reset below
+        _stack[-1][1] = max(_stack[-1][1], tracemalloc.get_traced_memory()[1])
+    before, fds_before, started = _snapshot(), _open_fds(), time.perf_counter()
+    tracemalloc.reset_peak()
+    _stack.append([name, 0])
+    sampler = _ChildSampler(); sampler.start()
+    try:
+        yield
+    finally:
+        child_peak_kb = sampler.stop()
+        _, nested_peak = _stack.pop()
+        current, peak = tracemalloc.get_traced_memory()
+        peak = max(peak, nested_peak)
+        after = _snapshot()
+        growth = [s for s in after.compare_to(before, 'lineno') if s.size_diff > 0][:TOP_SITES]
+        fds_after = _open_fds()
+        _stages.append({
+            "stage": name, "seconds": round(time.perf_counter() - started, 3),
+            "peak_bytes": peak, "retained_bytes": sum(t.size for t in after.traces) - sum(t.size for t in before.traces),
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "open_fds": fds_after, "leaked_fds": None if fds_before is None or fds_after is None else fds_after - fds_before,
+            "child_peak_rss_kb": child_peak_kb,
+            "top_sites": [{"site": str(s.traceback), "size_diff": s.size_diff, "count_diff": s.count_diff} for s in growth],
+        })
+        if _stack:
+            _stack[-1][1] = max(_stack[-1][1], peak)
+
+def _mb(value):
+    return f"{value / (1024 * 1024):.1f} MB"
+
+def report():
+    """Prints the per-stage table (and writes REPORT_FILE). Registered at exit once profiling starts."""
+    if not _stages: return
+    lines = ["--- Memory profile (tracemalloc peak/retained are Python allocations only) ---"]
+    for s in _stages:
+        fds = f"{s['open_fds']} ({s['leaked_fds']:+d})" if s["leaked_fds"] is not None else "n/a"
+        children = f"{s['child_peak_rss_kb'] / 1024:.1f} MB" if s["child_peak_rss_kb"] is not None else "n/a"
+        lines.append(f"{s['stage']:<20} {s['seconds']:8.2f}s  peak {_mb(s['peak_bytes']):>9}  retained {_mb(s['retained_bytes']):>9}  "
+                     f"max rss {s['max_rss_kb'] / 1024:.1f} MB  fds {fds}  child peak {children}")
+        for site in s["top_sites"]:
+            lines.append(f"    {_mb(site['size_diff']):>9} in {site['count_diff']:+d} blocks  {site['site']}")
+    print("\n".join(lines), file=sys.stderr)
+    if REPORT_FILE:
+        with open(REPORT_FILE, 'w') as f: json.dump(_stages, f, indent=2)
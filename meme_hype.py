@@ -1,26 +1,30 @@
-meme_hype.py
+# meme_hype.py
 # post_x_final_trusted_poster.py
 
 import os
 import logging
 import requests
 import configparser
-import re
 import sys
 import random
 import html
 import json
 import time
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright, expect
-from groq import Groq
+import importlib.util
 
 # Spacy is no longer needed, simplifying dependencies
+# bs4, playwright and groq are imported by the step that uses them, so a run with no new article never pays for them.
 try:
     from PIL import Image
+    import meme_index
+    import entity_matcher
+    import http_client
 except ImportError:
     print("FATAL ERROR: A required library is not installed. Run: pip install Pillow")
     sys.exit(1)
+if any(importlib.util.find_spec(name) is None for name in ("bs4", "playwright", "groq")):
+    print("FATAL ERROR: A required library is not installed. Run: pip install beautifulsoup4 lxml playwright groq")
+    sys.exit(1)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(filename)s] - %(message)s')
 logger = logging.getLogger(__name__)
@@ -30,7 +34,11 @@ CONFIG_FILE = "config.ini"
 HISTORY_FILE = "processed_urls.txt"
 AUTH_FILE = "auth_x.json"
 MEME_FILE = "downloaded_meme.png" # We are using memes, not charts
+MEME_HASH_FILE = "used_meme_hashes.txt" # Perceptual hashes of memes already posted
+MEME_CANDIDATES = 8 # Memes requested per API call; the first one we haven't used before wins
+MAX_MEME_BYTES = 5 * 1024 * 1024 # X rejects larger images anyway
 GROQ_API_KEY = None
+COIN_MATCHER = None # Built on first use from TICKER_MAP plus the coin lexicon file
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"
 SEGMENT_SOURCES = { "Crypto": [{"name": "Cointelegraph", "url": "https://cointelegraph.com/rss"}, {"name": "The Block", "url": "https://www.theblock.co/feed"}, {"name": "CoinDesk", "url": "https://www.coindesk.com/arc/outboundfeeds/rss/"},] }
 TWITTER_HANDLES = { "Binance": "@binance", "Ethereum": "@ethereum", "Bitcoin": "@Bitcoin", "Solana": "@solana", "SEC": "@SECGov" }
@@ -54,13 +62,17 @@ def save_processed_url(url):
     with open(HISTORY_FILE, 'a') as f: f.write(url + '\n')
     logger.info(f"Saved used URL to history to prevent re-posting: {url}")
 
+def get_coin_matcher():
+    global COIN_MATCHER
+    if COIN_MATCHER is None:
+        lexicon = entity_matcher.load_lexicon()
+        COIN_MATCHER = entity_matcher.build_matcher({**lexicon, **TICKER_MAP}, ticker_only=entity_matcher.ticker_forms(lexicon))
+    return COIN_MATCHER
+
 def identify_crypto_ticker(text):
-    text_lower = text.lower()
-    for name, ticker in TICKER_MAP.items():
-        # Check for whole word matches to avoid partial matches (e.g., 'art' in 'Cardano')
-        if re.search(r'\b' + re.escape(name) + r'\b', text_lower):
-            return ticker
-    return None
+    """Returns the ticker of the first coin mentioned in text (whole words only, e.g. not 'art' in 'Cardano')."""
+    matches = entity_matcher.find_entities(get_coin_matcher(), text)
+    return matches[0][2] if matches else None
 
 # --- SCRAPING AND MEME FUNCTIONS (WITH THE FIX) ---
 
@@ -69,12 +81,13 @@ def scrape_news(processed_urls):
     Scrapes RSS feeds for the FIRST available article that has not been processed yet.
     THIS FUNCTION CONTAINS THE PRIMARY BUG FIX.
     """
+    from bs4 import BeautifulSoup
     sources = list(SEGMENT_SOURCES["Crypto"]); random.shuffle(sources)
     for source in sources:
         try:
             logger.info(f"Scraping {source['name']} for meme-worthy articles...")
             time.sleep(random.uniform(1, 2))
-            response = requests.get(source['url'], headers={"User-Agent": USER_AGENT}, timeout=20)
+            response = http_client.cached_get(source['url'], headers={"User-Agent": USER_AGENT}, timeout=20)
             response.raise_for_status()
             soup = BeautifulSoup(response.content, 'lxml-xml')
 
@@ -100,35 +113,62 @@ def scrape_news(processed_urls):
     # If we get through all sources and find nothing new, return None.
     return None
 
-def get_relevant_meme():
-    """Fetches a trending meme from r/cryptomemes."""
+def download_meme_image(meme_url):
+    """Streams an image download, bailing out as soon as it is clearly too big or not an image. Returns bytes or None."""
+    with http_client.get(meme_url, stream=True, timeout=15, headers={"User-Agent": USER_AGENT}) as image_response:
+        image_response.raise_for_status()
+        declared_size = int(image_response.headers.get('Content-Length') or 0)
+        if declared_size > MAX_MEME_BYTES:
+            logger.info(f"Skipping {meme_url}: {declared_size} bytes is over the {MAX_MEME_BYTES} byte limit.")
+            return None
+        data = bytearray()
+        for chunk in image_response.iter_content(chunk_size=8192):
+            if not data and not meme_index.sniff_image_format(chunk[:16]):
+                logger.info(f"Skipping {meme_url}: not a PNG/JPEG/GIF/WEBP image.")
+                return None
+            data.extend(chunk)
+            if len(data) > MAX_MEME_BYTES:
+                logger.info(f"Skipping {meme_url}: download exceeded {MAX_MEME_BYTES} bytes.")
+                return None
+        return bytes(data)
+
+def get_relevant_meme(used_memes):
+    """Fetches a batch of trending memes from r/cryptomemes and returns the first one we haven't posted before."""
     try:
-        api_url = "https://meme-api.com/gimme/cryptomemes/1"
-        logger.info(f"Requesting a fresh meme from {api_url}...")
-        response = requests.get(api_url, timeout=15)
+        api_url = f"https://meme-api.com/gimme/cryptomemes/{MEME_CANDIDATES}"
+        logger.info(f"Requesting fresh memes from {api_url}...")
+        response = http_client.get(api_url, timeout=15)  # Random memes on every call, so never cached
         response.raise_for_status()
         data = response.json()
 
         if not data or 'memes' not in data or not data['memes']:
             logger.error("Meme API did not return any memes.")
-            return None, None
+            return None, None, None
 
-        meme = data['memes'][0]
-        meme_url = meme.get('url')
-        meme_title = meme.get('title')
+        for meme in data['memes']:
+            meme_url = meme.get('url')
+            meme_title = meme.get('title')
+            if not meme_url: continue
+            try:
+                image_bytes = download_meme_image(meme_url)
+                if not image_bytes: continue
+                meme_hash = meme_index.dhash_bytes(image_bytes)
+            except Exception as e:
+                logger.warning(f"Could not use meme {meme_url}: {e}")
+                continue
+            if meme_index.is_duplicate(used_memes, meme_hash):
+                logger.info(f"Skipping '{meme_title}': near-duplicate of a meme we already posted.")
+                continue
 
-        image_response = requests.get(meme_url, stream=True)
-        image_response.raise_for_status()
-        
-        with open(MEME_FILE, 'wb') as f:
-            for chunk in image_response.iter_content(chunk_size=8192):
-                f.write(chunk)
+            with open(MEME_FILE, 'wb') as f: f.write(image_bytes)
+            logger.info(f"Successfully downloaded meme: '{meme_title}'")
+            return MEME_FILE, meme_title, meme_hash
 
-        logger.info(f"Successfully downloaded meme: '{meme_title}'")
-        return MEME_FILE, meme_title
+        logger.error(f"All {len(data['memes'])} candidate memes were unusable or already posted.")
+        return None, None, None
     except Exception as e:
         logger.error(f"Failed to get a relevant meme: {e}")
-        return None, None
+        return None, None, None
 
 def get_llm_tweet(news_title, meme_title, client):
     """Generates a funny tweet connecting the news to the meme."""
@@ -164,6 +204,7 @@ def generate_hashtags(ticker):
 # --- UNCHANGED POSTING FUNCTION ---
 def post_final_tweet(tweet_content, meme_path=None):
     logger.info("--- Initiating Tweet Posting Sequence ---")
+    from playwright.sync_api import sync_playwright, expect
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=False, slow_mo=500)
         page = None
@@ -204,7 +245,6 @@ def post_final_tweet(tweet_content, meme_path=None):
 
 def main():
     if not setup_environment(): sys.exit(1)
-    llm_client = Groq(api_key=GROQ_API_KEY)
     processed_urls = load_processed_urls()
     
     article = scrape_news(processed_urls)
@@ -212,11 +252,14 @@ def main():
         logger.error("Failed to find any new articles to make fun of after checking all sources. Exiting.")
         sys.exit(0) # Exit gracefully, not as an error
         
-    meme_path, meme_title = get_relevant_meme()
+    used_memes = meme_index.load_index(MEME_HASH_FILE)
+    meme_path, meme_title, meme_hash = get_relevant_meme(used_memes)
     if not meme_path:
         logger.error("Could not get a meme. Cannot proceed.")
         sys.exit(1)
         
+    from groq import Groq
+    llm_client = Groq(api_key=GROQ_API_KEY)
     tweet_body = get_llm_tweet(article['title'], meme_title, llm_client)
     
     ticker = identify_crypto_ticker(article['title'])
@@ -229,6 +272,7 @@ def main():
     if post_final_tweet(final_tweet, meme_path):
         # Only save the URL AFTER a successful post
         save_processed_url(article['link'])
+        meme_index.add_to_index(used_memes, meme_hash)
         logger.info("Process completed successfully.")
     else:
         logger.error("Failed to post tweet. The URL will not be saved, allowing a retry on the next run.")
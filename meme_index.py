@@ -0,0 +1,105 @@
+"""
+Perceptual-hash index of memes we have already posted.
+
+Each image is reduced to a 64-bit difference hash (dHash), which survives re-encoding, resizing and small
+watermarks. Lookups use multi-index hashing: the hash is cut into radius + 1 bit ranges, and by the
+pigeonhole principle any hash within the radius matches at least one range exactly. Each range has its own
+hash table, so a lookup only compares against the few hashes sharing a range instead of the whole index
+(a BK-tree degrades towards a full scan on 64-bit hashes at this radius). The index is persisted as one
+hex hash per line and rebuilt on load.
+"""
+import io
+import logging
+import os
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8  # 8x8 comparisons -> 64-bit hash
+DUPLICATE_DISTANCE = 6  # Hashes this close (in differing bits) are treated as the same meme
+# Leading bytes of the formats X accepts for image posts.
+IMAGE_SIGNATURES = {b'\x89PNG\r\n\x1a\n': "png", b'\xff\xd8\xff': "jpeg", b'GIF87a': "gif", b'GIF89a': "gif"}
+
+def dhash(image):
+    """64-bit difference hash: is each pixel brighter than its right neighbour on a 9x8 grayscale thumbnail?"""
+    if image.format == "JPEG":
+        image.draft('L', (HASH_SIZE * 8, HASH_SIZE * 8))  # Decode at a fraction of full size; plenty for a 9x8 thumb
+    pixels = list(image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+def dhash_bytes(data):
+    with Image.open(io.BytesIO(data)) as image:
+        return dhash(image)
+
+def sniff_image_format(head):
+    """Returns the image format from the first bytes of a file, or None if it is not one we accept."""
+    for signature, fmt in IMAGE_SIGNATURES.items():
+        if head.startswith(signature):
+            return fmt
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return "webp"
+    return None
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+def _chunk_layout(radius):
+    """Splits the hash into radius + 1 bit ranges as [(shift, mask)]."""
+    chunks, bits = radius + 1, HASH_SIZE * HASH_SIZE
+    widths = [bits // chunks + (1 if i < bits % chunks else 0) for i in range(chunks)]
+    layout, shift = [], 0
+    for width in widths:
+        layout.append((shift, (1 << width) - 1))
+        shift += width
+    return layout
+
+def new_index(radius=DUPLICATE_DISTANCE):
+    layout = _chunk_layout(radius)
+    return {"radius": radius, "layout": layout, "tables": [{} for _ in layout], "hashes": set(), "path": None}
+
+def insert(index, value):
+    """Adds a hash to every chunk table, returning False if it was already present."""
+    if value in index["hashes"]:
+        return False
+    index["hashes"].add(value)
+    for (shift, mask), table in zip(index["layout"], index["tables"]):
+        table.setdefault((value >> shift) & mask, []).append(value)
+    return True
+
+def search(index, value):
+    """Returns [(distance, hash)] for every indexed hash within the index radius of value."""
+    seen, matches = set(), []
+    for (shift, mask), table in zip(index["layout"], index["tables"]):
+        for candidate in table.get((value >> shift) & mask, ()):
+            if candidate in seen: continue
+            seen.add(candidate)
+            distance = hamming(value, candidate)
+            if distance <= index["radius"]:
+                matches.append((distance, candidate))
+    return matches
+
+def is_duplicate(index, value):
+    return bool(search(index, value))
+
+def load_index(path):
+    """Builds the multi-index hash tables from a file of hex hashes (missing file -> empty index)."""
+    index = new_index()
+    index["path"] = path
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line: insert(index, int(line, 16))
+    logger.info(f"Loaded {len(index['hashes'])} meme hashes from '{path}'.")
+    return index
+
+def add_to_index(index, value):
+    """Inserts a hash and appends it to the index file."""
+    if insert(index, value) and index["path"]:
+        with open(index["path"], 'a') as f: f.write(f"{value:016x}\n")
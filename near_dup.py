@@ -0,0 +1,116 @@
+"""
+Near-duplicate detection for news stories with MinHash signatures and an LSH index.
+
+A story is reduced to the set of content words ("shingles") of its normalized title and summary: stop words
+are dropped and plural/-ed/-ing endings trimmed. Rewrites of one story by different outlets keep most of
+those words but reorder and rephrase them, so longer word n-grams miss them (two AP/Reuters-style rewrites
+score 0.4-0.7 on content-word unigrams but under 0.15 on word 3-grams). MinHash compresses the set into NUM_PERMUTATIONS integers
+whose agreement rate estimates the Jaccard similarity of two stories. The signature is cut into BANDS bands;
+stories sharing any band land in the same bucket and become candidates, so each lookup touches only a
+handful of stories instead of the whole history.
+"""
+import json
+import logging
+import os
+import random
+import re
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 1
+NUM_PERMUTATIONS = 128  # Estimate standard error ~0.04 around the threshold
+BANDS = 64  # 64 bands x 2 rows: pairs at the threshold become candidates with probability > 0.999
+SIMILARITY_THRESHOLD = 0.35  # Cross-feed rewrites score ~0.4-0.7; unrelated stories stay under ~0.2, same-topic ones ~0.3
+STOP_WORDS = set("""a about after also amid an and are as at be been before but by for from had has have he her his in into
+    is it its just more no not of on or our out over said say says than that the their then there these they this
+    those to up was we were which while who will with would you your""".split())
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(20240611)  # Fixed seed: signatures must stay comparable across runs
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+def normalize(text):
+    text = re.sub(r'<[^<]+?>', ' ', text.lower())
+    return re.sub(r'[^a-z0-9]+', ' ', text).split()
+
+def _stem(word):
+    """Trims the commonest inflections so 'votes'/'voted'/'voting' and 'vote' share a shingle."""
+    for suffix in ('ing', 'ed', 'es', 's'):
+        if len(word) > 4 and word.endswith(suffix): return word[:-len(suffix)]
+    return word
+
+def content_words(text):
+    return [_stem(word) for word in normalize(text) if word not in STOP_WORDS]
+
+def shingles(text, size=SHINGLE_SIZE):
+    words = content_words(text)
+    if len(words) < size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def minhash(text):
+    """Returns the MinHash signature (a tuple of NUM_PERMUTATIONS ints) of a story's text."""
+    hashed = [zlib.crc32(s.encode('utf-8')) for s in shingles(text)]
+    if not hashed:
+        return tuple([_MERSENNE_PRIME] * NUM_PERMUTATIONS)
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashed) for a, b in _PERMUTATIONS)
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of the two stories behind the signatures."""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERMUTATIONS
+
+def _band_keys(signature):
+    rows = NUM_PERMUTATIONS // BANDS
+    return [(band, signature[band * rows:(band + 1) * rows]) for band in range(BANDS)]
+
+def new_index():
+    return {"buckets": {}, "entries": []}
+
+def add(index, signature, label, timestamp=None):
+    """Adds a story signature to the index. label is what find_duplicate reports (e.g. the title)."""
+    entry = {"signature": tuple(signature), "label": label, "time": timestamp or time.time()}
+    index["entries"].append(entry)
+    for key in _band_keys(entry["signature"]):
+        index["buckets"].setdefault(key, []).append(entry)
+
+def find_duplicate(index, signature, threshold=SIMILARITY_THRESHOLD):
+    """Returns (label, similarity) of the most similar indexed story at or above threshold, else None."""
+    best = None
+    for key in _band_keys(signature):
+        for entry in index["buckets"].get(key, ()):
+            score = similarity(signature, entry["signature"])
+            if score >= threshold and (best is None or score > best[1]):
+                best = (entry["label"], score)
+    return best
+
+def load_index(path, window_hours):
+    """Builds an index from the stories published in the last window_hours (missing file -> empty index)."""
+    index = new_index()
+    if os.path.exists(path):
+        cutoff = time.time() - window_hours * 3600
+        try:
+            with open(path, 'r') as f: stored = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read story signatures from '{path}': {e}. Starting fresh.")
+            stored = []
+        stale = 0
+        for entry in stored:
+            if len(entry["signature"]) != NUM_PERMUTATIONS: stale += 1; continue  # Written by an older shingling scheme
+            if entry["time"] >= cutoff: add(index, entry["signature"], entry["label"], entry["time"])
+        if stale: logger.info(f"Ignored {stale} story signatures from an older signature format.")
+    logger.info(f"Loaded {len(index['entries'])} recent story signatures for duplicate detection.")
+    return index
+
+def save_signatures(path, new_entries, window_hours):
+    """Appends [(signature, label)] to the rolling store and drops anything older than the window."""
+    cutoff, now = time.time() - window_hours * 3600, time.time()
+    stored = []
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f: stored = json.load(f)
+        except (OSError, ValueError):
+            stored = []
+    stored = [entry for entry in stored if entry["time"] >= cutoff and len(entry["signature"]) == NUM_PERMUTATIONS]
+    stored.extend({"signature": list(signature), "label": label, "time": now} for signature, label in new_entries)
+    with open(path, 'w') as f: json.dump(stored, f)
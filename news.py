@@ -1,29 +1,49 @@
 # news.py
 # FINAL CORRECTION: Fixed the 'Invalid pitch' error. Pitch now uses Hz.
 
-import os, logging, shutil, tempfile, re, subprocess, requests, math, random, asyncio, edge_tts, configparser, html, sys
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
+import os, logging, shutil, tempfile, re, subprocess, math, random, asyncio, configparser, html, sys, hashlib, json, threading, importlib.util, time
 from PIL import Image, ImageDraw, ImageFont
 from urllib.parse import urljoin
-
-try:
-    import spacy
-    from matplotlib import font_manager
-except ImportError:
-    print("FATAL ERROR: A required library is not installed.")
-    sys.exit(1)
+import near_dup, mem_profile, preview, http_client
+# Heavy dependencies (spacy, matplotlib, bs4, playwright, edge_tts) are imported by the stage that needs them,
+# so runs that fail fast or find nothing new ("no new articles", exit 10) never pay for them.
+if any(importlib.util.find_spec(name) is None for name in ("spacy", "matplotlib", "bs4", "playwright", "edge_tts")):
+    print("FATAL ERROR: A required library is not installed."); sys.exit(1)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(filename)s] - %(message)s')
 logger = logging.getLogger(__name__)
 
 VIDEO_WIDTH, VIDEO_HEIGHT = 1080, 1920; HEADLINES_LIMIT = 4; MIN_CLIP_DURATION = 5; USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36"; FONT_PATH, NLP_MODEL, UNSPLASH_API_KEY = None, None, None; VOICE = "en-US-AriaNeural"; HISTORY_FILE, DESCRIPTION_FILE, LAST_SEGMENT_FILE, CONFIG_FILE = "processed_urls.txt", "video_description.txt", "last_segment.txt", "config.ini"; FPS = 24; OUTRO_GIF_NAME = "snap_feed.gif"
+OUTRO_CACHE_DIR = "outro_cache"; OUTRO_TEXT = "For hourly updates on latest news, please like and subscribe."; OUTRO_DURATION = 5
+# Every clip (including the outro) is encoded with identical stream parameters so the concat demuxer can stream-copy them together.
+CLIP_VIDEO_ARGS = ['-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-r', str(FPS)]; CLIP_AUDIO_ARGS = ['-c:a', 'aac', '-b:a', '192k', '-ar', '24000', '-ac', '1']
+# NEWS_PIPE_MEDIA=1: stills and narration go to ffmpeg through pipes instead of temp files, and the remaining intermediates live on tmpfs.
+PIPE_MEDIA = os.environ.get("NEWS_PIPE_MEDIA") == "1"; TMPFS_DIR = "/dev/shm"
+# MPEG audio Layer III tables for mp3_duration(): kbit/s by bitrate index, Hz by sample-rate index, per version (1, 2, 2.5).
+MP3_BITRATES = {1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320), 2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)}
+MP3_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 2.5: (11025, 12000, 8000)}
+# Summary cleanup runs on every feed item, so it splits sentences with precompiled rules; NEWS_SENTENCIZER=spacy uses the full en_core_web_sm pipeline instead.
+SENTENCIZER = os.environ.get("NEWS_SENTENCIZER", "regex"); TAG_PATTERN = re.compile(r'<[^<]+?>'); JUNK_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (r'\[\s*\+\s*video\s*\]', r'\b(continue reading|read more)\b.*', r'<img.*?>')]
+SENTENCE_BREAK_PATTERN = re.compile(r'(?:(?<=[.!?])|(?<=[.!?]["\'”’)\]]))\s+(?=["\'“‘(\[]?[A-Z0-9])|\n\s*\n'); SENTENCE_ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "prof.", "sen.", "rep.", "gov.", "gen.", "lt.", "col.", "sgt.", "st.", "jr.", "sr.", "vs.", "no.", "inc.", "corp.", "co.", "ltd.", "jan.", "feb.", "mar.", "apr.", "aug.", "sept.", "sep.", "oct.", "nov.", "dec.", "u.s.", "u.k.", "u.n.", "e.g.", "i.e.", "etc.", "approx."}
+# NEWS_RENDITIONS="1080x1920,720x1280@1500k": extra output sizes (optional video bitrate) encoded from the same decode; the first is the main video.
+RENDITIONS_SPEC = os.environ.get("NEWS_RENDITIONS", "")
+# RUN_DEADLINE_EPOCH (set by master_controller): as time runs out the run degrades in this order -- clips without an Unsplash image,
+# a faster x264 motion search, dropping the remaining clips, no freshly rendered outro -- so a valid video is still out before the deadline.
+RUN_DEADLINE = float(os.environ["RUN_DEADLINE_EPOCH"]) if re.fullmatch(r'\d+(\.\d+)?', os.environ.get("RUN_DEADLINE_EPOCH", "")) else None
+DEADLINE_SKIP_IMAGE_SECONDS = 120; DEADLINE_FAST_ENCODE_SECONDS = 75; DEADLINE_NEW_CLIP_SECONDS = 60; DEADLINE_SKIP_OUTRO_SECONDS = 40; DEADLINE_CONCAT_RESERVE_SECONDS = 10
+# Cheaper search only: ref/bframes/b-pyramid/weightp/cabac/8x8dct stay at x264's default ('medium') values, so the SPS/PPS
+# match the other clips and the outro and concat -c copy stays valid. A faster -preset would change them and corrupt the join.
+DEADLINE_FAST_X264_PARAMS = 'ref=3:bframes=3:b-pyramid=normal:weightp=2:cabac=1:8x8dct=1:subme=1:me=dia:trellis=0:mixed-refs=0:rc-lookahead=10'
+BACKGROUND_COLOR = '#181818'; CANVAS_TEMPLATE = None; STORY_SIGNATURES_FILE = "story_signatures.json"; DUPLICATE_WINDOW_HOURS = 48 # Stories similar to anything published in this window are skipped
 SEGMENT_SOURCES = {"Top Stories": [{"name": "The Leading Report", "url": "https://theleadingreport.com/", "type": "custom"}, {"name": "Associated Press", "url": "https://storage.googleapis.com/afs-prod/feeds/topnews.xml"}, {"name": "Reuters Top News", "url": "http://feeds.reuters.com/reuters/topNews"}, {"name": "NPR News", "url": "https://feeds.npr.org/1001/rss.xml"},], "Political": [{"name": "The Leading Report", "url": "https://theleadingreport.com/", "type": "custom"}, {"name": "Reuters Politics", "url": "http://feeds.reuters.com/reuters/politicsNews"}, {"name": "Politico", "url": "https://rss.politico.com/politico.xml"}, {"name": "The Hill", "url": "https://thehill.com/rss/syndicator/19109"},], "US National": [{"name": "Reuters US News", "url": "http://feeds.reuters.com/reuters/domesticNews"}, {"name": "NPR National News", "url": "https://feeds.npr.org/1003/rss.xml"},]}
 SEGMENT_ORDER = ["Top Stories", "Political", "US National"]
 KEN_BURNS_EFFECTS = [ "zoompan=z='min(zoom+0.001,1.1)':d=1:x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)'", "zoompan=z='min(zoom+0.0012,1.15)':d=1:x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)'", "zoompan=z=1.1:x='if(gte(in_w,iw),0,if(eq(mod(on,2),0),min(x+1,iw-in_w),x))':y='if(gte(in_h,ih),0,if(eq(mod(on,3),0),min(y+1,ih-in_h),y))'", "zoompan=z=1.1:x='min(x+iw/200, iw-iw/1.1)':y=0", "zoompan=z=1.1:x=0:y='min(y+ih/200, ih-ih/1.1)'", "zoompan=z=1.1:x='min(x+iw/250, iw-iw/1.1)':y='min(y+ih/250, ih-ih/1.1)'", "zoompan=z='min(zoom+0.001,1.15)':d=1:x='min(x+iw/300, iw-iw/zoom)':y='min(y+ih/400, ih-ih/zoom)'"]
 
+def seconds_left():
+    """Seconds until RUN_DEADLINE (infinite when the run has no deadline)."""
+    return math.inf if RUN_DEADLINE is None else RUN_DEADLINE - time.time()
 # --- THIS FUNCTION IS CORRECTED ---
-async def generate_dynamic_audio_async(text, output_path):
+def dynamic_voice(text):
     rate_val = random.randint(-10, 15)
     rate_str = f"+{rate_val}%" if rate_val >= 0 else f"{rate_val}%"
     
@@ -32,8 +52,17 @@ async def generate_dynamic_audio_async(text, output_path):
     pitch_str = f"+{pitch_val}Hz" if pitch_val >= 0 else f"{pitch_val}Hz"
     
     logger.info(f"Generating audio with dynamic voice: Rate={rate_str}, Pitch={pitch_str}")
-    communicate = edge_tts.Communicate(text, VOICE, rate=rate_str, pitch=pitch_str)
-    await communicate.save(output_path)
+    import edge_tts
+    return edge_tts.Communicate(text, VOICE, rate=rate_str, pitch=pitch_str)
+
+async def generate_dynamic_audio_async(text, output_path):
+    await dynamic_voice(text).save(output_path)
+
+async def generate_dynamic_audio_bytes_async(text):
+    audio = bytearray()
+    async for chunk in dynamic_voice(text).stream():
+        if chunk["type"] == "audio": audio.extend(chunk["data"])
+    return bytes(audio)
 
 def generate_audio(text, output_path):
     try:
@@ -42,6 +71,36 @@ def generate_audio(text, output_path):
     except Exception as e:
         logger.error(f"Error generating audio: {e}")
         return False
+
+def mp3_duration(data):
+    """
+    Duration in seconds of MPEG Layer III audio, from its frame headers (CBR or VBR, after any ID3v2 tag; a Xing/Info
+    frame adds at most one frame of error). None if the data is not a clean run of Layer III frames.
+    """
+    pos, samples, sample_rate = 0, 0, None
+    if data[:3] == b'ID3' and len(data) >= 10: pos = 10 + ((data[6] & 0x7f) << 21 | (data[7] & 0x7f) << 14 | (data[8] & 0x7f) << 7 | (data[9] & 0x7f))
+    while pos + 4 <= len(data):
+        if data[pos:pos + 3] == b'TAG': break  # ID3v1 trailer
+        b1, b2 = data[pos + 1], data[pos + 2]
+        version = {3: 1, 2: 2, 0: 2.5}.get((b1 >> 3) & 3)
+        if data[pos] != 0xFF or (b1 & 0xE0) != 0xE0 or version is None or (b1 >> 1) & 3 != 1 or b2 >> 4 in (0, 15) or (b2 >> 2) & 3 == 3: return None
+        bitrate = MP3_BITRATES[1 if version == 1 else 2][b2 >> 4] * 1000; rate = MP3_SAMPLE_RATES[version][(b2 >> 2) & 3]
+        if sample_rate not in (None, rate): return None
+        sample_rate, frame_samples = rate, 1152 if version == 1 else 576
+        pos += frame_samples // 8 * bitrate // rate + ((b2 >> 1) & 1); samples += frame_samples
+    return samples / sample_rate if sample_rate else None
+def probe_duration(source, data=None):
+    """Duration in seconds via ffprobe, of a file path or (with data) of bytes fed on stdin."""
+    result = subprocess.run(['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', source],
+                            input=data, capture_output=True, check=True)
+    return float(result.stdout.strip())
+def generate_audio_bytes(text):
+    """Narration as in-memory MP3 bytes, or None on failure."""
+    try:
+        return asyncio.run(generate_dynamic_audio_bytes_async(text)) or None
+    except Exception as e:
+        logger.error(f"Error generating audio: {e}")
+        return None
 # ------------------------------------
 # ... (The rest of the file is unchanged)
 def setup_config():
@@ -63,9 +122,17 @@ def get_next_segment():
     logger.info(f"This run's segment is '{current_segment_name}'.")
     return current_segment_name, SEGMENT_SOURCES[current_segment_name]
 def setup_nlp_model():
+    """Checks that the spaCy model is installed without loading it (see get_nlp_model)."""
+    if importlib.util.find_spec("en_core_web_sm") is None: logger.error("FATAL: spaCy model 'en_core_web_sm' not found."); return False
+    return True
+def get_nlp_model():
+    """Loads the spaCy pipeline on first use."""
     global NLP_MODEL
-    try: NLP_MODEL = spacy.load("en_core_web_sm"); return True
-    except OSError: logger.error("FATAL: spaCy model 'en_core_web_sm' not found."); return False
+    if NLP_MODEL is None:
+        import spacy
+        try: NLP_MODEL = spacy.load("en_core_web_sm")
+        except OSError: logger.error("FATAL: spaCy model 'en_core_web_sm' not found."); sys.exit(1)
+    return NLP_MODEL
 def load_processed_urls():
     if not os.path.exists(HISTORY_FILE): return set()
     with open(HISTORY_FILE, 'r') as f: return {line.strip() for line in f if line.strip()}
@@ -75,17 +142,29 @@ def save_processed_urls(new_urls):
     logger.info(f"Saved {len(new_urls)} new URLs to history.")
 def setup_font():
     global FONT_PATH
+    from matplotlib import font_manager
     font_preferences = ["Arial", "Helvetica Neue", "Calibri", "Helvetica", "DejaVu Sans", "Liberation Sans"]
     for font_name in font_preferences:
         try: FONT_PATH = font_manager.findfont(font_name, fallback_to_default=False); return True
         except Exception: pass
     logger.error("FATAL: Could not find any suitable system fonts."); return False
-def setup_output_directory(): return tempfile.mkdtemp(prefix="news_video_")
+def setup_output_directory():
+    if PIPE_MEDIA and os.path.isdir(TMPFS_DIR) and os.access(TMPFS_DIR, os.W_OK): return tempfile.mkdtemp(prefix="news_video_", dir=TMPFS_DIR)
+    return tempfile.mkdtemp(prefix="news_video_")
+def split_sentences(text):
+    """Rule-based sentence splitter: breaks after . ! ? (plus closing quotes/brackets) before a capitalized word, except after abbreviations and initials."""
+    sentences, start = [], 0
+    for match in SENTENCE_BREAK_PATTERN.finditer(text):
+        last_word = text[start:match.start()].rsplit(None, 1)[-1].lower() if text[start:match.start()].strip() else ""
+        if last_word in SENTENCE_ABBREVIATIONS or re.fullmatch(r'(?:[a-z]\.)+', last_word): continue # "Dr. Smith", "J. Doe", "U.S. officials"
+        sentences.append(text[start:match.start()].strip()); start = match.end()
+    sentences.append(text[start:].strip())
+    return [sent for sent in sentences if sent]
 def clean_summary_text(raw_text):
-    text = html.unescape(raw_text); text = re.sub('<[^<]+?>', '', text)
-    junk_patterns = [r'\[\s*\+\s*video\s*\]', r'(?i)\b(continue reading|read more)\b.*', r'<img.*?>']
-    for pattern in junk_patterns: text = re.sub(pattern, '', text, flags=re.IGNORECASE)
-    doc = NLP_MODEL(text); sentences = [sent.text.strip() for sent in doc.sents]
+    text = TAG_PATTERN.sub('', html.unescape(raw_text))
+    for pattern in JUNK_PATTERNS: text = pattern.sub('', text)
+    if SENTENCIZER == "spacy": sentences = [sent.text.strip() for sent in get_nlp_model()(text).sents]
+    else: sentences = split_sentences(text)
     clean_summary = ""
     sentence_count = 0
     for sent in sentences:
@@ -98,6 +177,7 @@ def scrape_leading_report(processed_urls, limit):
     logger.info("-> Firing up custom scraper for The Leading Report...")
     articles = []; base_url = "https://theleadingreport.com/"
     try:
+        from playwright.sync_api import sync_playwright
         with sync_playwright() as p:
             browser = p.chromium.launch(headless=True)
             page = browser.new_page(user_agent=USER_AGENT)
@@ -122,14 +202,25 @@ def scrape_leading_report(processed_urls, limit):
     except Exception as e: logger.error(f"An error occurred during custom scraping for The Leading Report: {e}")
     return articles
 def scrape_news(segment_feeds, processed_urls):
+    from bs4 import BeautifulSoup
     all_headlines = []; headers = {"User-Agent": USER_AGENT}
+    # Near-duplicate check (same story from several outlets) against this batch and recent runs,
+    # done before summary cleanup and long before the image, TTS and encode stages.
+    story_index = near_dup.load_index(STORY_SIGNATURES_FILE, DUPLICATE_WINDOW_HOURS)
+    def is_duplicate_story(title, signature):
+        duplicate = near_dup.find_duplicate(story_index, signature)
+        if duplicate: logger.info(f"  -> Skipping near-duplicate ({duplicate[1]:.0%} similar to '{duplicate[0][:50]}'): {title[:50]}")
+        return bool(duplicate)
     for source in segment_feeds:
         if source.get("type") == "custom":
-            all_headlines.extend(scrape_leading_report(processed_urls, 10))
+            for article in scrape_leading_report(processed_urls, 10):
+                signature = near_dup.minhash(f"{article['title']} {article['summary']}")
+                if not is_duplicate_story(article['title'], signature):
+                    article["signature"] = signature; near_dup.add(story_index, signature, article['title']); all_headlines.append(article)
             continue
         try:
             logger.info(f"Scraping {source['name']} (RSS)")
-            response = requests.get(source['url'], headers=headers, timeout=15); response.raise_for_status()
+            response = http_client.cached_get(source['url'], headers=headers, timeout=15); response.raise_for_status()
             soup = BeautifulSoup(response.content, 'lxml-xml')
             for item in soup.find_all('item', limit=10):
                 link = item.find('link').text.strip() if item.find('link') else None
@@ -137,9 +228,12 @@ def scrape_news(segment_feeds, processed_urls):
                     title = item.find('title').text.strip()
                     desc_tag = item.find('description')
                     if title and desc_tag and desc_tag.text:
+                        signature = near_dup.minhash(f"{title} {desc_tag.text}")
+                        if is_duplicate_story(title, signature): continue
                         summary = clean_summary_text(desc_tag.text)
                         if 50 < len(summary) < 600:
-                            all_headlines.append({ "title": title, "link": link, "summary": summary })
+                            all_headlines.append({ "title": title, "link": link, "summary": summary, "signature": signature })
+                            near_dup.add(story_index, signature, title)
         except Exception as e: logger.error(f"Failed to scrape RSS feed {source['name']}: {e}")
     unique_headlines = list({item['link']: item for item in all_headlines}.values())
     if not unique_headlines: logger.warning("Could not find any new, unprocessed headlines."); return []
@@ -150,61 +244,101 @@ def search_unsplash_for_image(query):
     headers = {"Authorization": f"Client-ID {UNSPLASH_API_KEY}"}
     params = {"query": query, "orientation": "portrait", "per_page": 1}
     try:
-        response = requests.get("https://api.unsplash.com/search/photos", headers=headers, params=params, timeout=15)
+        response = http_client.cached_get("https://api.unsplash.com/search/photos", headers=headers, params=params, timeout=15)
         response.raise_for_status()
         data = response.json()
         if data['results']: return data['results'][0]['urls']['regular']
         else: return None
     except Exception as e: logger.error(f"Unsplash API request failed: {e}"); return None
-def create_clip_asset(summary, original_headline, output_path):
+def create_clip_asset(summary, original_headline, output_path=None, with_image=True):
+    """Renders the clip still (with_image=False skips the Unsplash lookup). Saves it when output_path is given and returns the PIL image."""
     logger.info(f"Creating visual asset for: {original_headline}")
-    doc = NLP_MODEL(original_headline)
-    query_parts = [token.text for token in doc if token.pos_ in ['PROPN', 'NOUN'] and not token.is_stop and len(token.text) > 3]
-    query = " ".join(query_parts) if query_parts else original_headline
-    image_url = search_unsplash_for_image(query)
+    image_url = None
+    if with_image:
+        doc = get_nlp_model()(original_headline)
+        query_parts = [token.text for token in doc if token.pos_ in ['PROPN', 'NOUN'] and not token.is_stop and len(token.text) > 3]
+        query = " ".join(query_parts) if query_parts else original_headline
+        image_url = search_unsplash_for_image(query)
     TEXT_AREA_HEIGHT, IMAGE_AREA_HEIGHT = 1100, VIDEO_HEIGHT - 1100
-    canvas = Image.new('RGB', (VIDEO_WIDTH, VIDEO_HEIGHT), color='#181818'); draw = ImageDraw.Draw(canvas)
+    canvas = new_canvas(); draw = ImageDraw.Draw(canvas)
     font_headline = ImageFont.truetype(FONT_PATH, 90)
     font_summary = ImageFont.truetype(FONT_PATH, 60)
     y_after_headline = draw_multiline_text(draw, original_headline, font_headline, 980, 150, '#FFFFFF')
     draw_multiline_text(draw, summary, font_summary, 950, y_after_headline + 60, '#CCCCCC')
     if image_url:
         try:
-            image_response = requests.get(image_url, stream=True, timeout=15, headers={'User-Agent': USER_AGENT})
+            image_response = http_client.get(image_url, stream=True, timeout=15, headers={'User-Agent': USER_AGENT})
             image_response.raise_for_status()
-            article_image = Image.open(image_response.raw).convert("RGB")
-            cropped_image = crop_to_fill(article_image, VIDEO_WIDTH, IMAGE_AREA_HEIGHT)
+            cropped_image = load_image_to_fill(image_response.raw, VIDEO_WIDTH, IMAGE_AREA_HEIGHT)
             canvas.paste(cropped_image, (0, TEXT_AREA_HEIGHT)); logger.info(f"Successfully attached image from Unsplash.")
         except Exception as e: logger.error(f"Failed to process image {image_url}: {e}")
-    else: logger.warning("Could not find a suitable image from Unsplash for this clip.")
-    canvas.save(output_path); return True
+    elif with_image: logger.warning("Could not find a suitable image from Unsplash for this clip.")
+    if output_path: canvas.save(output_path)
+    return canvas
 def check_ffmpeg():
     return shutil.which("ffmpeg")
 def create_video_clips(news_items, temp_dir):
     clips_data = []
     for i, item in enumerate(news_items):
+        if clips_data and seconds_left() < DEADLINE_NEW_CLIP_SECONDS:
+            logger.warning(f"Deadline: {seconds_left():.0f}s left, dropping the remaining {len(news_items) - i} clip(s)."); break
         original_headline, summary = item['title'], item['summary']
         logger.info(f"--- Processing clip {i+1}/{len(news_items)}: {original_headline[:60]}... ---")
         visual_path = os.path.join(temp_dir, f"visual_{i}.png"); audio_path = os.path.join(temp_dir, f"audio_{i}.mp3")
         narration_text = f"{original_headline}. {summary}"
-        if not create_clip_asset(summary, original_headline, visual_path): continue
-        if not generate_audio(narration_text, audio_path): continue
+        with_image = seconds_left() >= DEADLINE_SKIP_IMAGE_SECONDS
+        if not with_image: logger.warning(f"Deadline: {seconds_left():.0f}s left, rendering this clip without an Unsplash image.")
+        canvas = create_clip_asset(summary, original_headline, None if PIPE_MEDIA else visual_path, with_image)
+        if not canvas: continue
+        audio_bytes = generate_audio_bytes(narration_text)
+        if not audio_bytes: continue
+        clip = {"url": item['link'], "title": original_headline}
         try:
-            ffprobe_cmd = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', audio_path]
-            result = subprocess.run(ffprobe_cmd, capture_output=True, text=True, check=True)
-            audio_duration = float(result.stdout.strip())
-            final_duration = max(MIN_CLIP_DURATION, audio_duration + 1.5)
-            clips_data.append({"visual_path": visual_path, "audio_path": audio_path, "duration": final_duration, "url": item['link'], "title": original_headline})
-        except Exception as e: logger.error(f"Failed to process audio for clip: {e}")
+            if PIPE_MEDIA:
+                # Frame headers give the exact duration without an ffprobe process; anything unexpected goes through ffprobe on stdin.
+                audio_duration = mp3_duration(audio_bytes) or probe_duration('pipe:0', audio_bytes); clip.update(frame=canvas, audio=audio_bytes)
+            else:
+                with open(audio_path, 'wb') as f: f.write(audio_bytes)
+                audio_duration = probe_duration(audio_path); clip.update(visual_path=visual_path, audio_path=audio_path)
+        except Exception as e: logger.error(f"Failed to process audio for clip: {e}"); continue
+        clip["duration"] = max(MIN_CLIP_DURATION, audio_duration + 1.5)
+        clips_data.append(clip)
     return clips_data
+def encode_clip_from_memory(clip, output_args, ffmpeg_path):
+    """Runs one clip encode with the still as raw RGB on stdin and the narration on an inherited pipe fd."""
+    frame = clip['frame']; audio_read, audio_write = os.pipe()
+    cmd = [ffmpeg_path, '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f"{frame.width}x{frame.height}", '-i', 'pipe:0', '-f', 'mp3', '-i', f"pipe:{audio_read}", *output_args]
+    try: proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, pass_fds=(audio_read,))
+    except Exception: os.close(audio_write); raise
+    finally: os.close(audio_read) # ffmpeg holds its own copy
+    def feed_audio():
+        try:
+            with os.fdopen(audio_write, 'wb') as f: f.write(clip['audio'])
+        except BrokenPipeError: pass # ffmpeg exited early; its stderr says why
+    feeder = threading.Thread(target=feed_audio, daemon=True); feeder.start()
+    _, stderr = proc.communicate(input=frame.tobytes()); feeder.join()
+    if proc.returncode != 0: raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr.decode('utf-8', errors='replace'))
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''): digest.update(chunk)
+    return digest.hexdigest()
+def outro_cache_key(gif_path):
+    """Everything that changes the rendered outro: text, voice, artwork, layout and stream parameters."""
+    key_parts = [OUTRO_TEXT, VOICE, file_sha256(gif_path), os.path.basename(FONT_PATH or ""), VIDEO_WIDTH, VIDEO_HEIGHT, OUTRO_DURATION, CLIP_VIDEO_ARGS, CLIP_AUDIO_ARGS]
+    return hashlib.sha256(json.dumps(key_parts).encode('utf-8')).hexdigest()[:20]
+def outro_cache_path(gif_path):
+    return os.path.join(OUTRO_CACHE_DIR, f"outro_{outro_cache_key(gif_path)}.mp4")
 def create_outro_clip(temp_dir, ffmpeg_path, gif_path):
+    """Returns the 'Like & Subscribe' outro, rendering it (one TTS call, one encode) only when its cache key changed."""
+    os.makedirs(OUTRO_CACHE_DIR, exist_ok=True)
+    cached_outro_path = outro_cache_path(gif_path)
+    if os.path.exists(cached_outro_path):
+        logger.info(f"Using cached outro clip '{cached_outro_path}'."); return cached_outro_path
     outro_audio_path = os.path.join(temp_dir, "outro_audio.mp3")
     outro_image_path = os.path.join(temp_dir, "outro_image.png")
-    outro_base_video_path = os.path.join(temp_dir, "outro_base.mp4")
-    final_outro_path = os.path.join(temp_dir, "outro_final.mp4")
-    outro_duration = 5
-    outro_text = "For hourly updates on latest news, please like and subscribe."
-    if not generate_audio(outro_text, outro_audio_path): raise Exception("Failed to generate outro audio.")
+    rendered_outro_path = os.path.join(temp_dir, "outro_final.mp4")
+    if not generate_audio(OUTRO_TEXT, outro_audio_path): raise Exception("Failed to generate outro audio.")
     canvas = Image.new('RGB', (VIDEO_WIDTH, VIDEO_HEIGHT), color='#1A1A1A')
     draw = ImageDraw.Draw(canvas)
     font_large = ImageFont.truetype(FONT_PATH, 150); font_small = ImageFont.truetype(FONT_PATH, 60)
@@ -212,47 +346,132 @@ def create_outro_clip(temp_dir, ffmpeg_path, gif_path):
     draw.text((VIDEO_WIDTH / 2, 500), "& SUBSCRIBE", font=font_large, fill='#FFFFFF', anchor="ms")
     draw.text((VIDEO_WIDTH / 2, 620), "For Hourly News Updates!", font=font_small, fill='#CCCCCC', anchor="ms")
     canvas.save(outro_image_path)
-    cmd_base = [ffmpeg_path, '-loop', '1', '-i', outro_image_path, '-i', outro_audio_path, '-c:v', 'libx264', '-c:a', 'aac', '-b:a', '192k', '-pix_fmt', 'yuv420p', '-t', str(outro_duration), '-y', outro_base_video_path]
-    subprocess.run(cmd_base, check=True, capture_output=True, text=True)
+    # Background, looping GIF overlay and narration in a single encode.
     overlay_x, overlay_y = "(W-w)/2", "(H-h)/2 + 250"
-    cmd_overlay = [ffmpeg_path, '-i', outro_base_video_path, '-i', gif_path, '-filter_complex', f"[1:v]scale=450:-1[gif];[0:v][gif]overlay={overlay_x}:{overlay_y}:shortest=1", '-c:a', 'copy', '-y', final_outro_path]
-    subprocess.run(cmd_overlay, check=True, capture_output=True, text=True)
-    return final_outro_path
-def compile_final_video(clips_data, output_path, ffmpeg_path):
+    cmd = [ffmpeg_path, '-loop', '1', '-framerate', str(FPS), '-i', outro_image_path, '-ignore_loop', '0', '-i', gif_path, '-i', outro_audio_path,
+           '-filter_complex', f"[1:v]scale=450:-1[gif];[0:v][gif]overlay={overlay_x}:{overlay_y}[v]", '-map', '[v]', '-map', '2:a',
+           *CLIP_VIDEO_ARGS, *CLIP_AUDIO_ARGS, '-t', str(OUTRO_DURATION), '-y', rendered_outro_path]
+    subprocess.run(cmd, check=True, capture_output=True, text=True)
+    for stale in os.listdir(OUTRO_CACHE_DIR):
+        if stale.startswith("outro_") and stale.endswith(".mp4"): os.remove(os.path.join(OUTRO_CACHE_DIR, stale))
+    shutil.move(rendered_outro_path, cached_outro_path + ".part"); os.replace(cached_outro_path + ".part", cached_outro_path) # Never leave a half-copied cache hit
+    logger.info(f"Rendered and cached new outro clip '{cached_outro_path}'.")
+    return cached_outro_path
+def parse_renditions(spec):
+    """
+    '1080x1920,720x1280@1500k' -> [(1080, 1920, None), (720, 1280, '1500k')]. The first entry is the main output.
+    Sizes whose aspect ratio differs from the 9:16 canvas are letterboxed, not stretched (see fit_filter); repeats are dropped.
+    """
+    renditions = []
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        size, _, bitrate = part.partition('@'); width, height = (int(v) // 2 * 2 for v in size.lower().split('x')) # yuv420p needs even sizes
+        rendition = (width, height, bitrate or None)
+        if rendition in renditions: logger.warning(f"Rendition '{part}' is listed twice. Encoding it once."); continue
+        if width * VIDEO_HEIGHT != height * VIDEO_WIDTH: logger.warning(f"Rendition {width}x{height} is not {VIDEO_WIDTH}:{VIDEO_HEIGHT}; it will be letterboxed.")
+        renditions.append(rendition)
+    return renditions
+def rendition_path(output_path, rendition, index):
+    """The first rendition keeps output_path; the others get a _WxH suffix (plus the bitrate, if it sets one)."""
+    if index == 0: return output_path
+    root, ext = os.path.splitext(output_path); return f"{root}_{rendition[0]}x{rendition[1]}{f'_{rendition[2]}' if rendition[2] else ''}{ext}"
+def master_size(renditions):
+    """The canvas-shaped size every rendition is derived from: the largest canvas scale that fits inside some rendition."""
+    factor = max(min(w / VIDEO_WIDTH, h / VIDEO_HEIGHT) for w, h, _ in renditions)
+    return max(2, int(VIDEO_WIDTH * factor) // 2 * 2), max(2, int(VIDEO_HEIGHT * factor) // 2 * 2)
+def fit_filter(width, height):
+    """Scales into width x height keeping the aspect ratio, padding the rest black (letterbox/pillarbox)."""
+    return f"scale={width}:{height}:force_original_aspect_ratio=decrease,pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1"
+def scaled_outro_clip(temp_dir, ffmpeg_path, gif_path, width, height):
+    """The cached outro at another rendition size, derived (and cached) from the full-size outro with one scale pass."""
+    base_outro_path = create_outro_clip(temp_dir, ffmpeg_path, gif_path)
+    if (width, height) == (VIDEO_WIDTH, VIDEO_HEIGHT): return base_outro_path
+    scaled_path = f"{os.path.splitext(base_outro_path)[0]}_{width}x{height}.mp4"
+    if not os.path.exists(scaled_path):
+        subprocess.run([ffmpeg_path, '-i', base_outro_path, '-vf', fit_filter(width, height), *CLIP_VIDEO_ARGS, *CLIP_AUDIO_ARGS, '-y', scaled_path + ".part.mp4"], check=True, capture_output=True, text=True)
+        os.replace(scaled_path + ".part.mp4", scaled_path)
+    return scaled_path
+def compile_final_video(clips_data, output_path, ffmpeg_path, temp_dir=None, draft=False, renditions=None):
+    """
+    Encodes every clip and concatenates them (plus the outro) once per rendition, (width, height, video bitrate or None).
+    Each clip is decoded and run through zoompan once at master_size(); split/scale(+pad) in the same filter graph
+    feed one encoder per rendition. draft=True renders a single fast low-res preview without the outro.
+    Near RUN_DEADLINE clips switch to a cheaper motion search (same stream headers), and clips that no longer fit are dropped from clips_data (in place).
+    """
     if not clips_data: return False
-    temp_dir = os.path.dirname(clips_data[0]["visual_path"]); concat_list_path = os.path.join(temp_dir, "concat_list.txt"); clip_files = []
+    temp_dir = temp_dir or os.path.dirname(clips_data[0]["visual_path"]); renditions = renditions or parse_renditions(RENDITIONS_SPEC) or [(VIDEO_WIDTH, VIDEO_HEIGHT, None)]
+    if draft: renditions, fps = [(*preview.preview_size(VIDEO_WIDTH, VIDEO_HEIGHT), None)], preview.PREVIEW_FPS; video_args, audio_args = preview.x264_args(fps), ['-c:a', 'aac', '-b:a', preview.PREVIEW_AUDIO_BITRATE, '-ar', '24000', '-ac', '1']
+    else: fps, video_args, audio_args = FPS, CLIP_VIDEO_ARGS, CLIP_AUDIO_ARGS
+    width, height = master_size(renditions)
+    clip_files = [[] for _ in renditions]; encode_seconds = None
     for i, clip in enumerate(clips_data):
-        clip_path = os.path.join(temp_dir, f"clip_{i}.mp4")
+        if encode_seconds and seconds_left() < encode_seconds * 1.5 + DEADLINE_CONCAT_RESERVE_SECONDS:
+            logger.warning(f"Deadline: {seconds_left():.0f}s left, dropping the last {len(clips_data) - i} clip(s)."); del clips_data[i:]; break
+        clip_video_args = video_args
+        if not draft and seconds_left() < DEADLINE_FAST_ENCODE_SECONDS:
+            logger.warning(f"Deadline: {seconds_left():.0f}s left, encoding with a faster motion search."); clip_video_args = [*video_args, '-x264-params', DEADLINE_FAST_X264_PARAMS]
+        clip_paths = [os.path.join(temp_dir, f"clip_{i}_r{k}_{w}x{h}.mp4") for k, (w, h, _) in enumerate(renditions)]
         chosen_effect = random.choice(KEN_BURNS_EFFECTS)
-        filter_str = f"scale={VIDEO_WIDTH}*2:-1,{chosen_effect}:s={VIDEO_WIDTH}x{VIDEO_HEIGHT}:fps={FPS}"
-        cmd = [ffmpeg_path, '-i', clip['visual_path'], '-i', clip['audio_path'], '-filter_complex', f"[0:v]{filter_str}[v]", '-map', '[v]', '-map', '1:a', '-c:v', 'libx264', '-c:a', 'aac', '-b:a', '192k', '-pix_fmt', 'yuv420p', '-r', str(FPS), '-shortest', '-y', clip_path]
+        filter_str = f"[0:v]scale={width}*2:-1,{chosen_effect}:s={width}x{height}:fps={fps}"
+        fits = ["null" if (w, h) == (width, height) else fit_filter(w, h) for w, h, _ in renditions]
+        if fits == ["null"]: filter_str += "[v0]"
+        else: filter_str += f",split={len(renditions)}" + "".join(f"[s{k}]" for k in range(len(renditions))) + "".join(f";[s{k}]{fit}[v{k}]" for k, fit in enumerate(fits))
+        output_args = ['-filter_complex', filter_str]
+        for k, (_, _, bitrate) in enumerate(renditions):
+            output_args += ['-map', f"[v{k}]", '-map', '1:a', *clip_video_args, *(['-b:v', bitrate] if bitrate else []), *audio_args, '-shortest', '-y', clip_paths[k]]
         try:
-            logger.info(f"Assembling video for clip {i+1}...")
-            subprocess.run(cmd, check=True, capture_output=True, text=True)
-            clip_files.append(clip_path)
+            logger.info(f"Assembling video for clip {i+1} ({len(renditions)} rendition(s))..."); encode_started = time.monotonic()
+            if 'frame' in clip: encode_clip_from_memory(clip, output_args, ffmpeg_path)
+            else: subprocess.run([ffmpeg_path, '-i', clip['visual_path'], '-i', clip['audio_path'], *output_args], check=True, capture_output=True, text=True)
+            for files, clip_path in zip(clip_files, clip_paths): files.append(clip_path)
+            encode_seconds = time.monotonic() - encode_started
         except subprocess.CalledProcessError as e: logger.error(f"Error creating video segment {i}: {e.stderr}"); return False
-    with open(concat_list_path, 'w') as f:
-        for clip_file in clip_files: f.write(f"file '{os.path.abspath(clip_file)}'\n")
-    if os.path.exists(OUTRO_GIF_NAME):
+    for k, rendition in enumerate(renditions):
+        concat_list_path = os.path.join(temp_dir, f"concat_list_{k}.txt"); final_path = rendition_path(output_path, rendition, k)
+        with open(concat_list_path, 'w') as f:
+            for clip_file in clip_files[k]: f.write(f"file '{os.path.abspath(clip_file)}'\n")
+        if draft: logger.info("Preview render: skipping the outro (it is cached at full quality).")
+        elif os.path.exists(OUTRO_GIF_NAME) and not os.path.exists(outro_cache_path(OUTRO_GIF_NAME)) and seconds_left() < DEADLINE_SKIP_OUTRO_SECONDS:
+            logger.warning(f"Deadline: {seconds_left():.0f}s left and no cached outro, skipping the outro.")
+        elif os.path.exists(OUTRO_GIF_NAME):
+            try:
+                logger.info(f"Adding 'Like & Subscribe' outro clip ({rendition[0]}x{rendition[1]})...")
+                outro_clip_path = scaled_outro_clip(temp_dir, ffmpeg_path, OUTRO_GIF_NAME, rendition[0], rendition[1])
+                with open(concat_list_path, 'a') as f: f.write(f"file '{os.path.abspath(outro_clip_path)}'\n")
+            except Exception as e: logger.error(f"Failed to create outro clip: {e}")
+        else: logger.warning(f"Outro GIF '{OUTRO_GIF_NAME}' not found. Skipping outro.")
+        final_cmd = [ffmpeg_path, '-f', 'concat', '-safe', '0', '-i', concat_list_path, '-c', 'copy', '-y', final_path]
         try:
-            logger.info(f"Creating 'Like & Subscribe' outro clip...")
-            outro_clip_path = create_outro_clip(temp_dir, ffmpeg_path, OUTRO_GIF_NAME)
-            with open(concat_list_path, 'a') as f: f.write(f"file '{os.path.abspath(outro_clip_path)}'\n")
-        except Exception as e: logger.error(f"Failed to create outro clip: {e}")
-    else: logger.warning(f"Outro GIF '{OUTRO_GIF_NAME}' not found. Skipping outro.")
-    final_cmd = [ffmpeg_path, '-f', 'concat', '-safe', '0', '-i', concat_list_path, '-c', 'copy', '-y', output_path]
-    try:
-        subprocess.run(final_cmd, check=True, capture_output=True, text=True)
-        logger.info(f"SUCCESS: Final video compiled at: {output_path}")
-        return True
-    except subprocess.CalledProcessError as e: logger.error(f"FATAL: Error compiling final video: {e.stderr}"); return False
-def crop_to_fill(image, target_width, target_height):
-    target_ratio = target_width / target_height; image_ratio = image.width / image.height
+            subprocess.run(final_cmd, check=True, capture_output=True, text=True)
+            logger.info(f"SUCCESS: Final video compiled at: {final_path}")
+        except subprocess.CalledProcessError as e: logger.error(f"FATAL: Error compiling final video: {e.stderr}"); return False
+    return True
+def fill_crop_box(width, height, target_width, target_height):
+    """Centered crop box of a width x height image with the target's aspect ratio."""
+    target_ratio = target_width / target_height; image_ratio = width / height
     if image_ratio > target_ratio:
-        new_width = int(target_ratio * image.height); left, right = (image.width - new_width) // 2, (image.width + new_width) // 2; top, bottom = 0, image.height
-    else:
-        new_height = int(image.width / target_ratio); top, bottom = (image.height - new_height) // 2, (image.height + new_height) // 2; left, right = 0, image.width
-    return image.crop((left, top, right, bottom)).resize((target_width, target_height), Image.LANCZOS)
+        new_width = int(target_ratio * height); return ((width - new_width) // 2, 0, (width + new_width) // 2, height)
+    new_height = int(width / target_ratio); return (0, (height - new_height) // 2, width, (height + new_height) // 2)
+def crop_to_fill(image, target_width, target_height):
+    return image.resize((target_width, target_height), Image.LANCZOS, box=fill_crop_box(image.width, image.height, target_width, target_height))
+def load_image_to_fill(fp, target_width, target_height):
+    """
+    Decodes an image straight to a target_width x target_height center crop, doing work proportional to the output.
+    JPEGs are decoded at a reduced DCT scale (draft mode) that still covers the crop; the crop box is then reduced
+    by an integer factor (Image.reduce via reducing_gap) and only the last step is a full LANCZOS resample.
+    """
+    image = Image.open(fp)
+    if image.format == "JPEG":
+        left, top, right, bottom = fill_crop_box(image.width, image.height, target_width, target_height)
+        oversize = min((right - left) / target_width, (bottom - top) / target_height)
+        if oversize > 1: image.draft('RGB', (math.ceil(image.width / oversize), math.ceil(image.height / oversize)))
+    if image.mode not in ("RGB", "RGBA", "L"): image = image.convert("RGB")
+    box = fill_crop_box(image.width, image.height, target_width, target_height)
+    return image.resize((target_width, target_height), Image.LANCZOS, box=box, reducing_gap=2.0).convert("RGB")
+def new_canvas():
+    """A fresh copy of the pre-rendered background; copying is cheaper than filling a new 1080x1920 image."""
+    global CANVAS_TEMPLATE
+    if CANVAS_TEMPLATE is None: CANVAS_TEMPLATE = Image.new('RGB', (VIDEO_WIDTH, VIDEO_HEIGHT), color=BACKGROUND_COLOR)
+    return CANVAS_TEMPLATE.copy()
 def draw_multiline_text(draw, text, font, max_width, start_y, text_color):
     words = text.split(); lines = [""]
     for word in words:
@@ -265,7 +484,7 @@ def draw_multiline_text(draw, text, font, max_width, start_y, text_color):
     return y
 def generate_summary_and_hashtags(clips_data, segment_name, output_file):
     logger.info("Generating video description and hashtags...")
-    doc = NLP_MODEL(". ".join(clip['title'] for clip in clips_data))
+    doc = get_nlp_model()(". ".join(clip['title'] for clip in clips_data))
     entities = {ent.text.strip() for ent in doc.ents if ent.label_ in ['PERSON', 'ORG', 'GPE']}
     keywords = {token.text for token in doc if token.pos_ in ['PROPN', 'NOUN'] and not token.is_stop and len(token.text) > 3}
     buzzwords = list(entities.union(keywords)); random.shuffle(buzzwords)
@@ -280,23 +499,32 @@ def generate_summary_and_hashtags(clips_data, segment_name, output_file):
     logger.info(f"Successfully saved description and hashtags to '{output_file}'")
 def main():
     ffmpeg_path = check_ffmpeg()
-    if not setup_config() or not setup_font() or not ffmpeg_path or not setup_nlp_model(): sys.exit(1)
+    if not setup_config() or not ffmpeg_path or not setup_nlp_model(): sys.exit(1)
     current_segment_name, segment_feeds = get_next_segment()
+    if RUN_DEADLINE is not None: logger.info(f"Run deadline in {seconds_left():.0f}s.")
     processed_urls = load_processed_urls()
     temp_dir = None
     try:
         temp_dir = setup_output_directory()
         output_video_path = os.path.join(os.getcwd(), f"news_{current_segment_name.replace(' ', '_')}.mp4")
-        news_items = scrape_news(segment_feeds, processed_urls)
+        with mem_profile.stage("scrape"): news_items = scrape_news(segment_feeds, processed_urls)
         if not news_items:
             logger.info("No new articles found. Exiting with status 10.")
             sys.exit(10)
-        
-        clips_data = create_video_clips(news_items, temp_dir)
-        if clips_data:
-            if compile_final_video(clips_data, output_video_path, ffmpeg_path):
+        if not setup_font(): sys.exit(1)
+        with mem_profile.stage("clips"): clips_data = create_video_clips(news_items, temp_dir)
+        if clips_data and preview.ENABLED:
+            # Draft render for review: nothing is recorded as published, so the full render later picks the same stories.
+            if preview.CONTACT_SHEET:
+                sheet_path = preview.contact_sheet([(clip['frame'] if 'frame' in clip else clip['visual_path'], f"{i+1}. {clip['duration']:.1f}s {clip['title']}") for i, clip in enumerate(clips_data)], os.path.splitext(preview.preview_path(output_video_path))[0] + "_sheet.png")
+                logger.info(f"Contact sheet saved to '{sheet_path}'.")
+            if not compile_final_video(clips_data, preview.preview_path(output_video_path), ffmpeg_path, temp_dir, draft=True): sys.exit(1)
+        elif clips_data:
+            with mem_profile.stage("encode"): compiled = compile_final_video(clips_data, output_video_path, ffmpeg_path, temp_dir)
+            if compiled:
                 newly_processed_urls = [clip['url'] for clip in clips_data]
                 save_processed_urls(newly_processed_urls)
+                near_dup.save_signatures(STORY_SIGNATURES_FILE, [(item['signature'], item['title']) for item in news_items if item['link'] in newly_processed_urls], DUPLICATE_WINDOW_HOURS)
                 generate_summary_and_hashtags(clips_data, current_segment_name, DESCRIPTION_FILE)
         else:
             logger.error("No valid clips were created. Final video not generated.")
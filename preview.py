@@ -0,0 +1,59 @@
+"""
+Draft preview settings shared by the video pipelines (news.py, script.py).
+
+Enable with PIPELINE_PREVIEW=1 or --preview: videos are rendered at PREVIEW_SCALE of the full resolution and
+PREVIEW_FPS with x264's ultrafast preset, written next to the full-quality name with a '_preview' suffix, and the
+pipeline leaves its publishing history untouched. --contact-sheet (or PIPELINE_CONTACT_SHEET=1) additionally
+saves one labelled frame per clip on a single image, so layout and timing can be checked at a glance.
+"""
+import os
+import sys
+
+from PIL import Image, ImageDraw, ImageFont
+
+ENABLED = os.environ.get("PIPELINE_PREVIEW") == "1" or "--preview" in sys.argv[1:]
+CONTACT_SHEET = os.environ.get("PIPELINE_CONTACT_SHEET") == "1" or "--contact-sheet" in sys.argv[1:]
+PREVIEW_SCALE = 0.5
+PREVIEW_FPS = 12
+PREVIEW_PRESET = "ultrafast"
+PREVIEW_CRF = 30
+PREVIEW_AUDIO_BITRATE = "64k"
+SHEET_COLUMNS = 4
+SHEET_THUMB_WIDTH = 270
+SHEET_LABEL_HEIGHT = 40
+SHEET_BACKGROUND = '#101010'
+
+def preview_size(width, height, scale=PREVIEW_SCALE):
+    """Scaled frame size, rounded down to even numbers as yuv420p requires."""
+    return max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2)
+
+def preview_path(output_path):
+    root, ext = os.path.splitext(output_path)
+    return f"{root}_preview{ext}"
+
+def x264_args(fps=PREVIEW_FPS):
+    return ['-c:v', 'libx264', '-preset', PREVIEW_PRESET, '-crf', str(PREVIEW_CRF), '-pix_fmt', 'yuv420p', '-r', str(fps)]
+
+def contact_sheet(frames, output_path, columns=SHEET_COLUMNS, thumb_width=SHEET_THUMB_WIDTH):
+    """
+    Tiles (image or image path, label) pairs into one grid image with each label under its thumbnail.
+    Thumbnails keep the aspect ratio of the first frame. Returns output_path.
+    """
+    thumbs = []
+    for frame, label in frames:
+        image = Image.open(frame) if isinstance(frame, (str, os.PathLike)) else frame
+        if image.format == "JPEG": image.draft('RGB', (thumb_width, thumb_width * 4))
+        thumb_height = thumbs[0][0].height if thumbs else max(1, round(image.height * thumb_width / image.width))
+        thumbs.append((image.convert('RGB').resize((thumb_width, thumb_height), Image.BILINEAR, reducing_gap=2.0), label))
+    if not thumbs:
+        return None
+    rows = -(-len(thumbs) // columns)
+    cell_height = thumbs[0][0].height + SHEET_LABEL_HEIGHT
+    sheet = Image.new('RGB', (min(columns, len(thumbs)) * thumb_width, rows * cell_height), color=SHEET_BACKGROUND)
+    draw, font = ImageDraw.Draw(sheet), ImageFont.load_default()
+    for i, (thumb, label) in enumerate(thumbs):
+        x, y = (i % columns) * thumb_width, (i // columns) * cell_height
+        sheet.paste(thumb, (x, y))
+        draw.text((x + 6, y + thumb.height + 6), label[:48], font=font, fill='#DDDDDD')
+    sheet.save(output_path)
+    return output_path
@@ -0,0 +1,152 @@
+"""
+Date-aligned close and volume matrices for every TICKER_MAP symbol, with cross-asset analytics.
+
+build writes two (days x tickers) float32 .npy files plus a small JSON index (dates, tickers) to
+PRICE_MATRIX_DIR. load_price_matrix() memory-maps the arrays, so readers only page in the rows they touch.
+Analytics work on the whole universe at once:
+  rolling_correlation  correlation of each ticker's daily log returns with a base ticker (BTC) over a window
+  rolling_beta         slope of each ticker's returns on the base ticker's returns over a window
+  relative_strength    return over a lookback and its rank across tickers (1 = strongest)
+  correlation_matrix   ticker x ticker return correlations over the last window, as one matrix product
+
+Usage:
+  python price_matrix.py build          # fetch every TICKER_MAP symbol and write PRICE_MATRIX_DIR
+  python price_matrix.py query SOL      # latest analytics for one ticker
+  python price_matrix.py query SOL 2024-03-01
+"""
+import json
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from indicators import align_closes, fetch_price_frames, rolling_mean
+
+logger = logging.getLogger(__name__)
+
+PRICE_MATRIX_DIR = "price_matrix"
+BASE_TICKER = "BTC"
+CORRELATION_WINDOW = 30
+BETA_WINDOW = 90
+STRENGTH_LOOKBACK = 30
+
+def build_price_matrix(price_frames):
+    """Returns (dates, tickers, closes, volumes); the arrays are (days x tickers) float32 with NaN for missing days."""
+    closes = align_closes(price_frames, 'Close')
+    volumes = align_closes(price_frames, 'Volume').reindex(index=closes.index, columns=closes.columns)
+    return closes.index, list(closes.columns), closes.to_numpy(dtype=np.float32), volumes.to_numpy(dtype=np.float32)
+
+def save_price_matrix(dates, tickers, closes, volumes, directory=PRICE_MATRIX_DIR):
+    os.makedirs(directory, exist_ok=True)
+    for name, values in (("closes", closes), ("volumes", volumes)):
+        np.save(os.path.join(directory, f"{name}.part.npy"), values)
+        os.replace(os.path.join(directory, f"{name}.part.npy"), os.path.join(directory, f"{name}.npy"))
+    index = {"dates": [str(d) for d in dates.values.astype('datetime64[D]')], "tickers": tickers}
+    with open(os.path.join(directory, "index.json"), 'w') as f: json.dump(index, f)
+    logger.info(f"Saved price matrix for {len(tickers)} tickers x {len(dates)} days to '{directory}'.")
+
+def load_price_matrix(directory=PRICE_MATRIX_DIR):
+    """Memory-maps a saved matrix. Returns a dict with 'dates', 'tickers', 'closes' and 'volumes'."""
+    with open(os.path.join(directory, "index.json"), 'r') as f: index = json.load(f)
+    return {
+        "dates": np.array(index["dates"], dtype='datetime64[D]'), "tickers": index["tickers"],
+        "closes": np.load(os.path.join(directory, "closes.npy"), mmap_mode='r'),
+        "volumes": np.load(os.path.join(directory, "volumes.npy"), mmap_mode='r'),
+    }
+
+def log_returns(closes):
+    """Daily log returns in float64, same shape as closes (first row NaN)."""
+    return np.diff(np.log(np.asarray(closes, dtype=np.float64)), axis=0, prepend=np.nan)
+
+def _paired(returns, base):
+    """Returns and base returns (broadcast to every column) with a day dropped wherever either side is missing."""
+    missing = np.isnan(returns) | np.isnan(base)[:, None]
+    return np.where(missing, np.nan, returns), np.where(missing, np.nan, base[:, None] + 0.0 * returns)
+
+def rolling_correlation(matrix, window=CORRELATION_WINDOW, base=BASE_TICKER):
+    """(days x tickers) correlation of every ticker's returns with the base ticker's over a trailing window."""
+    returns = log_returns(matrix["closes"])
+    x, b = _paired(returns, returns[:, matrix["tickers"].index(base)])
+    cov = rolling_mean(x * b, window) - rolling_mean(x, window) * rolling_mean(b, window)
+    var_x = rolling_mean(x * x, window) - rolling_mean(x, window) ** 2
+    var_b = rolling_mean(b * b, window) - rolling_mean(b, window) ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.clip(cov / np.sqrt(var_x * var_b), -1.0, 1.0)
+
+def rolling_beta(matrix, window=BETA_WINDOW, base=BASE_TICKER):
+    """(days x tickers) beta of every ticker against the base ticker over a trailing window."""
+    returns = log_returns(matrix["closes"])
+    x, b = _paired(returns, returns[:, matrix["tickers"].index(base)])
+    cov = rolling_mean(x * b, window) - rolling_mean(x, window) * rolling_mean(b, window)
+    var_b = rolling_mean(b * b, window) - rolling_mean(b, window) ** 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return cov / var_b
+
+def relative_strength(matrix, lookback=STRENGTH_LOOKBACK):
+    """Returns ((days x tickers) lookback return, rank per day with 1 = strongest, NaN where there is no return)."""
+    closes = np.asarray(matrix["closes"], dtype=np.float64)
+    change = np.full(closes.shape, np.nan)
+    change[lookback:] = closes[lookback:] / closes[:-lookback] - 1.0
+    order = np.argsort(np.where(np.isnan(change), -np.inf, change) * -1.0, axis=1, kind='stable')
+    ranks = np.empty_like(order); np.put_along_axis(ranks, order, np.arange(1, closes.shape[1] + 1)[None, :], axis=1)
+    return change, np.where(np.isnan(change), np.nan, ranks)
+
+def correlation_matrix(matrix, window=CORRELATION_WINDOW, end=None):
+    """Ticker x ticker correlation of daily returns over the `window` days ending at row `end` (default: last)."""
+    end = len(matrix["dates"]) if end is None else end + 1
+    returns = log_returns(matrix["closes"][max(0, end - window - 1):end])[1:]
+    valid = ~np.isnan(returns)
+    centered = np.where(valid, returns - np.nanmean(returns, axis=0), 0.0)
+    covariance = centered.T @ centered
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return covariance / np.sqrt(np.outer(np.diag(covariance), np.diag(covariance)))
+
+def query(matrix, ticker, date=None):
+    """Cross-asset snapshot for ticker on date (or the next trading day; default latest). None if unavailable."""
+    if ticker not in matrix["tickers"]:
+        return None
+    column = matrix["tickers"].index(ticker)
+    if date is None: row = len(matrix["dates"]) - 1
+    else: row = int(np.searchsorted(matrix["dates"], np.datetime64(pd.Timestamp(date).date(), 'D')))
+    if row >= len(matrix["dates"]):
+        return None
+    change, ranks = relative_strength(matrix)
+    to_float = lambda value: None if np.isnan(value) else float(value)
+    return {
+        "date": str(matrix["dates"][row]), "ticker": ticker,
+        "close": to_float(matrix["closes"][row, column]), "volume": to_float(matrix["volumes"][row, column]),
+        f"correlation_to_{BASE_TICKER.lower()}": to_float(rolling_correlation(matrix)[row, column]),
+        f"beta_to_{BASE_TICKER.lower()}": to_float(rolling_beta(matrix)[row, column]),
+        "strength_return": to_float(change[row, column]), "strength_rank": to_float(ranks[row, column]),
+        "universe_size": int(np.sum(~np.isnan(change[row]))),
+    }
+
+def latest_snapshot(ticker, directory=PRICE_MATRIX_DIR):
+    """query() on the saved matrix for the latest day, or None when no matrix has been built yet."""
+    if not os.path.exists(os.path.join(directory, "index.json")):
+        return None
+    try: return query(load_price_matrix(directory), ticker)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read price matrix from '{directory}': {e}")
+        return None
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(filename)s] - %(message)s')
+    if argv[:1] == ["build"]:
+        price_frames = fetch_price_frames()
+        if not price_frames:
+            logger.error("No price data could be fetched. Price matrix not written.")
+            return 1
+        save_price_matrix(*build_price_matrix(price_frames))
+        return 0
+    if argv[:1] == ["query"] and len(argv) in (2, 3):
+        result = query(load_price_matrix(), argv[1].upper(), argv[2] if len(argv) == 3 else None)
+        print(result if result else f"No data for {argv[1]}.")
+        return 0
+    print(__doc__)
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
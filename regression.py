@@ -0,0 +1,270 @@
+"""
+Batched polynomial regression: many series and several degrees in one set of NumPy calls.
+
+fit_polynomials() stacks every series' Vandermonde matrix into one (series x points x terms) array and takes a
+single batched QR decomposition of it. Because the columns are nested powers of x, the leading columns of that
+one factorization are also the QR of every lower degree, so all requested degrees come out of the same pass.
+x is shifted and scaled to [-1, 1] per series before the powers are taken to keep the system well conditioned;
+coefficients are therefore in that scaled variable, and predict() applies the same transform.
+NaN points are dropped per series by zeroing their rows, so series of different lengths can share one batch.
+"""
+import numpy as np
+
+MAD_TO_SIGMA = 1.4826  # Median absolute deviation -> standard deviation under Gaussian noise
+
+DEFAULT_DEGREES = (1, 2, 3)
+BOOTSTRAP_SAMPLES = 2000
+BOOTSTRAP_CHUNK = 250  # Resamples solved per batch; bounds the (chunk x points x terms) working set
+HUBER_DELTA = 1.345  # In robust-scale units; 95% efficiency under Gaussian noise
+HUBER_MAX_ITERATIONS = 50
+RANSAC_HYPOTHESES = 500
+RANSAC_CHUNK = 100  # Hypotheses scored per batch; bounds the (chunk x points) residual matrix
+RANSAC_CONFIDENCE = 0.99  # Stop once an all-inlier sample has been drawn with this probability
+RANSAC_THRESHOLD_MADS = 2.5  # Default inlier threshold, in robust standard deviations of the OLS residuals
+RANK_TOLERANCE = 1e-10  # |R[i, i]| below this (relative to the largest diagonal entry) means the term is not identifiable
+
+def _as_series(x, y):
+    """Broadcasts x and y to (series, points) float64 arrays."""
+    y = np.atleast_2d(np.asarray(y, dtype=np.float64))
+    x = np.broadcast_to(np.asarray(x, dtype=np.float64), y.shape)
+    return x, y
+
+def _scaled_design(x, y, max_degree):
+    """Masked, scaled Vandermonde matrices (series, points, max_degree + 1) plus the bookkeeping to undo the scaling."""
+    mask = np.isfinite(x) & np.isfinite(y)
+    with np.errstate(invalid='ignore'):
+        low = np.where(mask, x, np.inf).min(axis=1)
+        high = np.where(mask, x, -np.inf).max(axis=1)
+    offset = np.where(np.isfinite(low), (low + high) / 2, 0.0)
+    scale = np.where(np.isfinite(low) & (high > low), (high - low) / 2, 1.0)
+    t = np.where(mask, (x - offset[:, None]) / scale[:, None], 0.0)
+    return _powers(t, max_degree, mask), np.where(mask, y, 0.0), mask, offset, scale
+
+def _powers(t, max_degree, mask=True):
+    """Vandermonde columns t**0 .. t**max_degree along a new last axis (rows where mask is False are zero)."""
+    design = np.empty(np.shape(t) + (max_degree + 1,))
+    design[..., 0] = mask
+    for power in range(1, max_degree + 1):  # Repeated products; float ** is several times slower
+        design[..., power] = design[..., power - 1] * t
+    return design
+
+def fit_polynomials(x, y, degrees=DEFAULT_DEGREES):
+    """
+    Least-squares polynomial fits of every row of y (series x points) for every degree in degrees.
+    x is shared (points,) or per series (series, points). Returns a dict of arrays, with k = len(degrees):
+      degrees       (k,)
+      coefficients  (k, series, max_degree + 1)  increasing powers of the scaled x, NaN past each degree
+      offset, scale (series,)                    scaled x = (x - offset) / scale
+      r2, adj_r2    (k, series)                  NaN where a series has too few distinct points for the degree
+      rmse          (k, series)                  root mean squared residual
+      n             (series,)                    points used
+      best_degree   (series,)                    degree with the highest adjusted R² (-1 if none could be fitted)
+    """
+    degrees = np.asarray(sorted(set(degrees)))
+    x_input = x
+    x, y = _as_series(x, y)
+    max_degree = int(degrees[-1])
+    design, target, mask, offset, scale = _scaled_design(x, y, max_degree)
+    n = mask.sum(axis=1)
+
+    # One factorization serves every degree. With a shared x and no gaps every series has the same design matrix,
+    # so a single QR and two matrix products cover the whole batch.
+    shared = np.ndim(x_input) < 2 and mask.all()
+    q, r = np.linalg.qr(design[0] if shared else design)
+    qty = target @ q if shared else np.einsum('spt,sp->st', q, target)
+    r = np.broadcast_to(r, (y.shape[0],) + r.shape[-2:])
+    diagonal = np.abs(np.diagonal(r, axis1=1, axis2=2))
+    # A term is usable only if it and every lower term are independent of the columns before it.
+    identifiable = np.logical_and.accumulate(diagonal > RANK_TOLERANCE * np.maximum(diagonal.max(axis=1, keepdims=True), 1e-300), axis=1)
+
+    mean = target.sum(axis=1) / np.maximum(n, 1)
+    total_ss = (np.where(mask, y - mean[:, None], 0.0) ** 2).sum(axis=1)
+    series = y.shape[0]
+    coefficients = np.full((len(degrees), series, max_degree + 1), np.nan)
+    r2, adj_r2, rmse = (np.full((len(degrees), series), np.nan) for _ in range(3))
+    for i, degree in enumerate(degrees):
+        terms = degree + 1
+        ok = identifiable[:, degree] & (n > terms)
+        r_block = r[:, :terms, :terms].copy()
+        r_block[~ok] = np.eye(terms)  # Keeps the batched solve non-singular; those series are reported as NaN
+        beta = np.linalg.solve(r_block, qty[:, :terms, None])[..., 0]
+        fitted = qty[:, :terms] @ q[:, :terms].T if shared else np.einsum('spt,st->sp', q[:, :, :terms], qty[:, :terms])
+        residual_ss = (np.where(mask, target - fitted, 0.0) ** 2).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            score = np.where(total_ss > 0, 1.0 - residual_ss / total_ss, 1.0)
+            adjusted = 1.0 - (1.0 - score) * (n - 1) / (n - terms)
+        coefficients[i, :, :terms] = np.where(ok[:, None], beta, np.nan)
+        r2[i] = np.where(ok, score, np.nan)
+        adj_r2[i] = np.where(ok, adjusted, np.nan)
+        rmse[i] = np.where(ok, np.sqrt(residual_ss / np.maximum(n, 1)), np.nan)
+
+    fitted_any = ~np.isnan(adj_r2).all(axis=0)
+    best = np.nanargmax(np.where(np.isnan(adj_r2), -np.inf, adj_r2), axis=0)
+    return {
+        "degrees": degrees, "coefficients": coefficients, "offset": offset, "scale": scale,
+        "r2": r2, "adj_r2": adj_r2, "rmse": rmse, "n": n,
+        "best_degree": np.where(fitted_any, degrees[best], -1),
+    }
+
+def predict(fits, x, degree):
+    """Evaluates the degree-`degree` fit of every series at x (points,) -> (series, points)."""
+    i = int(np.searchsorted(fits["degrees"], degree))
+    if i >= len(fits["degrees"]) or fits["degrees"][i] != degree:
+        raise ValueError(f"Degree {degree} was not fitted (fitted: {list(fits['degrees'])}).")
+    t = (np.asarray(x, dtype=np.float64)[None, :] - fits["offset"][:, None]) / fits["scale"][:, None]
+    coefficients = fits["coefficients"][i]
+    values = np.zeros_like(t)
+    for power in range(degree, -1, -1):  # Horner's rule, one vectorized step per power
+        values = values * t + coefficients[:, power, None]
+    return values
+
+def fit_windows(values, window, degrees=DEFAULT_DEGREES, step=1):
+    """
+    Fits every column of values (days x tickers) over every trailing window of `window` days in one batch.
+    Result arrays are shaped (k, windows, tickers) instead of (k, series); x is the day index within the window.
+    (predict() expects the flat fit_polynomials layout.)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)[::step]  # (windows, tickers, window)
+    shape = windows.shape[:2]
+    fits = fit_polynomials(np.arange(window), windows.reshape(-1, window), degrees)
+    for key in ("r2", "adj_r2", "rmse"):
+        fits[key] = fits[key].reshape((len(fits["degrees"]),) + shape)
+    fits["coefficients"] = fits["coefficients"].reshape((len(fits["degrees"]),) + shape + (-1,))
+    for key in ("offset", "scale", "n", "best_degree"):
+        fits[key] = fits[key].reshape(shape)
+    return fits
+
+def bootstrap_bands(x, y, grid, degree=1, samples=BOOTSTRAP_SAMPLES, level=0.95, chunk_size=BOOTSTRAP_CHUNK, seed=None):
+    """
+    Percentile bootstrap bands for a degree-`degree` fit of one series, evaluated on grid.
+    Each chunk draws its resamples as one (chunk x points) index matrix, turns it into per-point counts and solves
+    all of their normal equations in one batched call. Resamples with too few distinct x values are discarded.
+    The prediction band adds a residual drawn from the same resample, inflated by sqrt(n / (n - terms)).
+    Returns a dict of arrays over grid: fit, confidence_lower/upper, prediction_lower/upper, plus 'samples' used.
+    """
+    x, y, grid = (np.asarray(v, dtype=np.float64).ravel() for v in (x, y, grid))
+    keep = np.isfinite(x) & np.isfinite(y)
+    x, y = x[keep], y[keep]
+    terms, n = degree + 1, len(x)
+    if n <= terms:
+        raise ValueError(f"Need more than {terms} points for a degree-{degree} bootstrap, got {n}.")
+    offset, scale = (x.min() + x.max()) / 2, max((x.max() - x.min()) / 2, 1e-12)
+    design, grid_design = _powers((x - offset) / scale, degree), _powers((grid - offset) / scale, degree)
+    rng = np.random.default_rng(seed)
+    inflation = np.sqrt(n / (n - terms))
+
+    # Normal-equation pieces per point: outer products x_i x_i^T and x_i y_i, flattened so a resample's sums are
+    # one (chunk x points) @ (points x terms²) product with its count matrix.
+    outer = (design[:, :, None] * design[:, None, :]).reshape(n, -1)
+    moment = design * y[:, None]
+    curves, predictions = [], []
+    for start in range(0, samples, chunk_size):
+        chunk = min(chunk_size, samples - start)
+        index = rng.integers(0, n, size=(chunk, n))
+        counts = np.bincount((index + np.arange(chunk)[:, None] * n).ravel(), minlength=chunk * n).reshape(chunk, n).astype(np.float64)
+        gram, rhs = (counts @ outer).reshape(chunk, terms, terms), counts @ moment
+        eigenvalues = np.linalg.eigvalsh(gram)
+        full_rank = eigenvalues[:, 0] > RANK_TOLERANCE * eigenvalues[:, -1]
+        beta = np.linalg.solve(gram[full_rank], rhs[full_rank, :, None])[..., 0]
+        curve = beta @ grid_design.T
+        # Prediction noise: the residual of a random member of the same resample at each grid point.
+        picks = np.take_along_axis(index[full_rank], rng.integers(0, n, size=curve.shape), axis=1)
+        residuals = (y[picks] - np.einsum('sgj,sj->sg', design[picks], beta)) * inflation
+        curves.append(curve); predictions.append(curve + residuals)
+
+    curves, predictions = np.concatenate(curves), np.concatenate(predictions)
+    tail = (1.0 - level) / 2 * 100
+    confidence = np.percentile(curves, [tail, 100 - tail], axis=0)
+    prediction = np.percentile(predictions, [tail, 100 - tail], axis=0)
+    fit = grid_design @ np.linalg.lstsq(design, y, rcond=None)[0]
+    return {"grid": grid, "fit": fit, "confidence_lower": confidence[0], "confidence_upper": confidence[1],
+            "prediction_lower": prediction[0], "prediction_upper": prediction[1], "samples": len(curves)}
+
+def _robust_scale(residuals, mask):
+    """Per-series MAD-based standard deviation of the masked residuals (series, points) -> (series,)."""
+    masked = np.where(mask, residuals, np.nan)
+    with np.errstate(all='ignore'):
+        mad = np.nanmedian(np.abs(masked - np.nanmedian(masked, axis=1, keepdims=True)), axis=1)
+    return np.fmax(MAD_TO_SIGMA * np.nan_to_num(mad), 1e-12)
+
+def _single_fit(degree, coefficients, offset, scale):
+    """Wraps (series, terms) coefficients in the fit_polynomials layout so predict() can evaluate them."""
+    return {"degrees": np.array([degree]), "coefficients": coefficients[None], "offset": offset, "scale": scale}
+
+def huber_fit(x, y, degree=1, delta=HUBER_DELTA, max_iterations=HUBER_MAX_ITERATIONS, tolerance=1e-8):
+    """
+    Huber-loss polynomial fits of every row of y by iteratively reweighted least squares.
+    Each iteration is one batched weighted solve for all series: residuals are scaled by their MAD, points
+    beyond delta get weight delta / |u|, and iteration stops when no coefficient moves by more than tolerance.
+    Returns the fit_polynomials layout for the single degree plus 'weights', 'inliers' (|u| <= delta, i.e. in
+    the quadratic zone of the loss) and 'iterations'.
+    """
+    x, y = _as_series(x, y)
+    design, target, mask, offset, scale = _scaled_design(x, y, degree)
+    weights = mask.astype(np.float64)
+    beta = np.zeros((y.shape[0], degree + 1))
+    for iteration in range(1, max_iterations + 1):
+        weighted = design * weights[..., None]
+        gram = np.einsum('snt,snu->stu', weighted, design) + np.eye(degree + 1) * 1e-12
+        new_beta = np.linalg.solve(gram, np.einsum('snt,sn->st', weighted, target)[..., None])[..., 0]
+        converged = np.max(np.abs(new_beta - beta)) <= tolerance * max(1.0, np.max(np.abs(new_beta)))
+        beta = new_beta
+        residuals = target - np.einsum('snt,st->sn', design, beta)
+        u = np.abs(residuals) / _robust_scale(residuals, mask)[:, None]
+        weights = np.where(mask, np.minimum(1.0, delta / np.maximum(u, 1e-12)), 0.0)
+        if converged: break
+    result = _single_fit(degree, beta, offset, scale)
+    result.update({"weights": weights, "inliers": mask & (u <= delta), "iterations": iteration})
+    return result
+
+def _ransac_trials_needed(inlier_ratio, terms):
+    """Hypotheses needed to draw one all-inlier sample with RANSAC_CONFIDENCE; infinite while no sample can be trusted."""
+    all_inlier = inlier_ratio ** terms
+    if all_inlier >= 1.0: return 0
+    if all_inlier <= 0.0: return np.inf  # No inliers yet (or the ratio underflowed): keep sampling up to `hypotheses`
+    return np.log(1 - RANSAC_CONFIDENCE) / np.log1p(-all_inlier)
+
+def ransac_fit(x, y, degree=1, hypotheses=RANSAC_HYPOTHESES, threshold=None, chunk_size=RANSAC_CHUNK, seed=None):
+    """
+    RANSAC polynomial fit of one series. Every hypothesis is an exact fit through degree + 1 random points;
+    a chunk of hypotheses is solved as one batched system and scored against all points as one residual matrix.
+    The hypothesis with the most inliers (ties: smallest inlier residual sum) is refit by least squares on its inliers.
+    Sampling stops early once the best inlier ratio says an all-inlier sample was drawn with RANSAC_CONFIDENCE.
+    threshold defaults to RANSAC_THRESHOLD_MADS robust standard deviations of the OLS residuals.
+    Returns the fit_polynomials layout plus 'inliers' (points,) and 'threshold'.
+    """
+    x, y = (np.asarray(v, dtype=np.float64).ravel() for v in (x, y))
+    design, target, mask, offset, scale = _scaled_design(x[None], y[None], degree)
+    design, target, mask = design[0], target[0], mask[0]
+    terms, valid = degree + 1, np.flatnonzero(mask)
+    if len(valid) < terms:
+        raise ValueError(f"Need at least {terms} points for a degree-{degree} RANSAC fit, got {len(valid)}.")
+    if threshold is None:
+        ols_residuals = target - design @ np.linalg.lstsq(design, target, rcond=None)[0]
+        threshold = RANSAC_THRESHOLD_MADS * _robust_scale(ols_residuals[None], mask[None])[0]
+    rng = np.random.default_rng(seed)
+
+    best_count, best_cost, best_inliers = -1, np.inf, None
+    for start in range(0, hypotheses, chunk_size):
+        picks = rng.integers(0, len(valid), size=(min(chunk_size, hypotheses - start), terms))  # Repeats are singular and dropped
+        sample_design = design[valid[picks]]
+        solvable = np.abs(np.linalg.det(sample_design)) > RANK_TOLERANCE
+        beta = np.linalg.solve(sample_design[solvable], target[valid[picks]][solvable][..., None])[..., 0]
+        residuals = np.abs(target[None, :] - beta @ design.T)
+        inliers = (residuals <= threshold) & mask
+        counts, costs = inliers.sum(axis=1), np.where(inliers, residuals, 0.0).sum(axis=1)
+        if not len(counts): continue
+        order = np.lexsort((costs, -counts))[0]
+        if counts[order] > best_count or (counts[order] == best_count and costs[order] < best_cost):
+            best_count, best_cost, best_inliers = counts[order], costs[order], inliers[order]
+        if start + chunk_size >= _ransac_trials_needed(max(best_count, 0) / len(valid), terms):
+            break
+    if best_inliers is None or best_count < terms:
+        raise ValueError("RANSAC found no hypothesis with enough inliers; try a larger threshold.")
+
+    beta = np.linalg.lstsq(design[best_inliers], target[best_inliers], rcond=None)[0]
+    inliers = mask & (np.abs(target - design @ beta) <= threshold)
+    result = _single_fit(degree, beta[None], offset, scale)
+    result.update({"inliers": inliers, "threshold": float(threshold)})
+    return result
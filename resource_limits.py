@@ -0,0 +1,165 @@
+import logging
+import os
+import re
+import resource
+import signal
+
+# --- CONFIGURATION ---
+# Seconds of CPU between the soft limit (SIGXCPU) and the hard limit (SIGKILL).
+CPU_HARD_LIMIT_GRACE_SECONDS = 5
+# Stderr lines that mean the child died because RLIMIT_AS refused an allocation.
+OUT_OF_MEMORY_PATTERNS = re.compile(r'MemoryError|Cannot allocate memory|std::bad_alloc|out of memory', re.IGNORECASE)
+
+# Limits accepted after the script name in the scripts config, e.g.
+#   news.py cpu=240 mem=2G nice=10 cgroup_mem=3G cgroup_cpu=150
+#   cpu:        RLIMIT_CPU in seconds of CPU time
+#   mem:        RLIMIT_AS (address space) in bytes, K/M/G suffixes allowed
+#   nice:       niceness increment for the script
+#   cgroup_mem: memory.max of the script's cgroup v2 slice (includes page cache and grandchildren)
+#   cgroup_cpu: cpu.max of the slice as a percentage of one core
+LIMIT_KEYS = {"cpu", "mem", "nice", "cgroup_mem", "cgroup_cpu"}
+
+def parse_size(value):
+    """Parses '512M', '2G', '1048576' into bytes."""
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([KMG]?)B?', value.strip().upper())
+    if not match:
+        raise ValueError(f"Invalid size '{value}'.")
+    return int(float(match.group(1)) * {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}[match.group(2)])
+
+def parse_limits(tokens):
+    """Turns ['cpu=240', 'mem=2G'] into a limits dict. Unknown or malformed entries raise ValueError."""
+    limits = {}
+    for token in tokens:
+        key, sep, value = token.partition('=')
+        if not sep or key not in LIMIT_KEYS:
+            raise ValueError(f"Unknown limit '{token}'. Expected one of: {', '.join(sorted(LIMIT_KEYS))}.")
+        limits[key] = parse_size(value) if key in ("mem", "cgroup_mem") else int(value)
+    return limits
+
+def cgroup_v2_available(parent):
+    """True if parent is a writable cgroup v2 directory we can create script slices under."""
+    return bool(parent) and os.path.exists(os.path.join(parent, "cgroup.controllers")) and os.access(parent, os.W_OK)
+
+def enable_controllers(parent, controllers):
+    """
+    Makes sure the parent delegates the given controllers to its children (cgroup.subtree_control).
+    Returns the subset that is actually enabled; the rest are logged as missing.
+    """
+    try:
+        with open(os.path.join(parent, "cgroup.controllers"), 'r') as f: available = set(f.read().split())
+        with open(os.path.join(parent, "cgroup.subtree_control"), 'r') as f: enabled = set(f.read().split())
+    except OSError as e:
+        logging.warning(f"Could not read the controllers of cgroup '{parent}': {e}.")
+        return set()
+    for controller in sorted(set(controllers) - enabled):
+        if controller not in available:
+            logging.warning(f"cgroup '{parent}' has no '{controller}' controller (not delegated to it by its own parent).")
+            continue
+        try:
+            # Fails with EBUSY if processes live directly in the parent (cgroup v2 "no internal processes" rule).
+            with open(os.path.join(parent, "cgroup.subtree_control"), 'w') as f: f.write(f"+{controller}")
+            enabled.add(controller)
+        except OSError as e:
+            logging.warning(f"Could not enable the '{controller}' controller in '{parent}/cgroup.subtree_control': {e}.")
+    return enabled & set(controllers)
+
+def prepare_cgroup(parent, script_name, limits):
+    """Creates (or reuses) a cgroup v2 slice for the script and applies its limits. Returns its path or None."""
+    wanted = {key: controller for key, controller in (("cgroup_mem", "memory"), ("cgroup_cpu", "cpu")) if key in limits}
+    if not wanted:
+        return None
+    if not cgroup_v2_available(parent):
+        logging.warning(f"cgroup v2 parent '{parent}' is not available. Running '{script_name}' with rlimits only.")
+        return None
+    enabled = enable_controllers(parent, wanted.values())
+    missing = [key for key, controller in wanted.items() if controller not in enabled]
+    if missing:
+        logging.warning(f"Limits {', '.join(missing)} for '{script_name}' cannot be applied: controller not enabled in '{parent}'.")
+    if len(missing) == len(wanted):
+        logging.warning(f"Running '{script_name}' with rlimits only.")
+        return None
+    path = os.path.join(parent, re.sub(r'[^A-Za-z0-9_.-]', '_', os.path.basename(script_name)))
+    try:
+        os.makedirs(path, exist_ok=True)
+        if "cgroup_mem" in limits and "cgroup_mem" not in missing:
+            with open(os.path.join(path, "memory.max"), 'w') as f: f.write(str(limits["cgroup_mem"]))
+        if "cgroup_cpu" in limits and "cgroup_cpu" not in missing:
+            with open(os.path.join(path, "cpu.max"), 'w') as f: f.write(f"{limits['cgroup_cpu'] * 1000} 100000")
+        return path
+    except OSError as e:
+        logging.warning(f"Could not set up cgroup '{path}': {e}. Running '{script_name}' with rlimits only.")
+        return None
+
+def read_oom_kills(cgroup_path):
+    """Returns the oom_kill counter of a cgroup slice (0 if unavailable)."""
+    if not cgroup_path:
+        return 0
+    try:
+        with open(os.path.join(cgroup_path, "memory.events"), 'r') as f:
+            for line in f:
+                key, _, value = line.partition(' ')
+                if key == "oom_kill": return int(value)
+    except OSError:
+        pass
+    return 0
+
+def open_memory_peak(cgroup_path):
+    """
+    Opens the slice's memory.peak and resets its watermark for this file handle (Linux 6.12+), so the slice's
+    lifetime peak from earlier runs is not reported again. None when there is no slice or the kernel cannot reset it.
+    """
+    if not cgroup_path:
+        return None
+    try:
+        handle = open(os.path.join(cgroup_path, "memory.peak"), 'r+')
+    except OSError:
+        return None
+    try:
+        handle.write("reset\n"); handle.flush()
+        return handle
+    except OSError:
+        handle.close()
+        return None
+
+def read_memory_peak_kb(handle):
+    """Peak memory (KiB, including page cache) charged to the slice since open_memory_peak(), or None."""
+    if handle is None:
+        return None
+    try:
+        handle.seek(0)
+        return int(handle.read().strip()) // 1024
+    except (OSError, ValueError):
+        return None
+    finally:
+        handle.close()
+
+def make_preexec_fn(limits, cgroup_path=None):
+    """Builds the function run in the forked child before exec: joins the cgroup, then applies nice and rlimits."""
+    if not limits and not cgroup_path:
+        return None
+    def preexec():
+        if cgroup_path:
+            with open(os.path.join(cgroup_path, "cgroup.procs"), 'w') as f: f.write(str(os.getpid()))
+        if "nice" in limits:
+            os.nice(limits["nice"])
+        if "cpu" in limits:
+            resource.setrlimit(resource.RLIMIT_CPU, (limits["cpu"], limits["cpu"] + CPU_HARD_LIMIT_GRACE_SECONDS))
+        if "mem" in limits:
+            resource.setrlimit(resource.RLIMIT_AS, (limits["mem"], limits["mem"]))
+    return preexec
+
+def detect_breach(limits, exit_code, stderr_tail, oom_kills_delta):
+    """
+    Returns 'cpu', 'mem' or 'cgroup_oom' if the run ended because it hit a configured limit, else None.
+    RLIMIT_CPU applies to each process on its own, so only the script being killed by SIGXCPU counts as a cpu breach;
+    CPU time summed over its ffmpeg/playwright children says nothing about it.
+    """
+    if exit_code == 0 or exit_code is None:
+        return None
+    if oom_kills_delta > 0:
+        return "cgroup_oom"
+    if "cpu" in limits and exit_code == -signal.SIGXCPU:
+        return "cpu"
+    if "mem" in limits and any(OUT_OF_MEMORY_PATTERNS.search(line) for line in stderr_tail):
+        return "mem"
+    return None
@@ -0,0 +1,103 @@
+"""
+"What if I had bought on day X?" for every day and every ticker at once.
+
+build_roi_matrix() turns the price history of each ticker into three (days x tickers) tables:
+  return_to_today  close today / close on the entry day - 1
+  best_return      best close reachable after the entry day (reverse cumulative max) / entry close - 1
+  recovery_days    days until the close is first back at or above the entry close (NaN if it never was)
+The result is saved as one float32 array so later runs can answer queries without rescanning price data.
+
+Usage:
+  python roi_matrix.py build              # fetch every TICKER_MAP symbol and write ROI_MATRIX_FILE
+  python roi_matrix.py query BTC 2022-11-21
+"""
+import logging
+import sys
+
+import numpy as np
+import pandas as pd
+
+from indicators import align_closes, fetch_price_frames
+
+logger = logging.getLogger(__name__)
+
+ROI_MATRIX_FILE = "roi_matrix.npz"
+METRICS = ("return_to_today", "best_return", "recovery_days")
+
+def next_recovery_index(close):
+    """
+    For every day i and column, the first j > i with close[j] >= close[i], or len(close) if there is none.
+    Uses a sparse table of power-of-two range maxima and binary lifting: log2(days) vectorized passes in total.
+    """
+    days = close.shape[0]
+    filled = np.where(np.isnan(close), -np.inf, close)
+    levels = max(1, int(np.ceil(np.log2(days + 1))))
+    pad = np.full((1 << levels, close.shape[1]), -np.inf)
+    table = [np.vstack([filled, pad])]  # table[k][i] = max(close[i : i + 2**k])
+    for k in range(1, levels):
+        prev, half = table[-1], 1 << (k - 1)
+        table.append(np.maximum(prev, np.vstack([prev[half:], pad[:half]])))
+
+    position = np.broadcast_to(np.arange(1, days + 1)[:, None], close.shape).copy()
+    columns = np.broadcast_to(np.arange(close.shape[1]), close.shape)
+    for k in reversed(range(levels)):
+        # Skip the next 2**k days if none of them reaches the entry price.
+        block_max = table[k][np.minimum(position, days), columns]
+        position = np.where((position < days) & (block_max < filled), position + (1 << k), position)
+    return np.minimum(position, days)
+
+def build_roi_matrix(price_frames):
+    """Returns (dates, tickers, values) where values has shape (len(METRICS), days, tickers) in float32."""
+    closes = align_closes(price_frames)
+    close = closes.to_numpy(dtype=np.float64)
+    days = close.shape[0]
+
+    latest_close = closes.ffill().iloc[-1].to_numpy()
+    return_to_today = latest_close / close - 1.0
+    best_close = np.fmax.accumulate(close[::-1], axis=0)[::-1]
+    best_return = best_close / close - 1.0
+
+    recovery = next_recovery_index(close)
+    recovery_days = np.where(recovery < days, recovery - np.arange(days)[:, None], np.nan)
+    recovery_days[np.isnan(close)] = np.nan
+
+    values = np.stack([return_to_today, best_return, recovery_days]).astype(np.float32)
+    return closes.index, list(closes.columns), values
+
+def save_roi_matrix(dates, tickers, values, path=ROI_MATRIX_FILE):
+    np.savez(path, dates=dates.values.astype('datetime64[D]'), tickers=np.array(tickers), values=values)
+    logger.info(f"Saved ROI matrix for {len(tickers)} tickers x {len(dates)} days to '{path}'.")
+
+def load_roi_matrix(path=ROI_MATRIX_FILE):
+    """Loads a saved matrix as a dict with 'dates', 'tickers' and 'values'."""
+    with np.load(path) as data:
+        return {"dates": data["dates"], "tickers": list(data["tickers"]), "values": data["values"]}
+
+def query_roi(matrix, ticker, date):
+    """Returns the precomputed metrics for buying ticker at the close of date (or the next trading day)."""
+    column = matrix["tickers"].index(ticker)
+    row = int(np.searchsorted(matrix["dates"], np.datetime64(pd.Timestamp(date).date(), 'D')))
+    if row >= len(matrix["dates"]):
+        return None
+    result = {name: float(matrix["values"][m, row, column]) for m, name in enumerate(METRICS)}
+    result["entry_date"] = str(matrix["dates"][row])
+    return result
+
+def main(argv):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(filename)s] - %(message)s')
+    if argv[:1] == ["build"]:
+        price_frames = fetch_price_frames()
+        if not price_frames:
+            logger.error("No price data could be fetched. ROI matrix not written.")
+            return 1
+        save_roi_matrix(*build_roi_matrix(price_frames))
+        return 0
+    if len(argv) == 3 and argv[0] == "query":
+        result = query_roi(load_roi_matrix(), argv[1].upper(), argv[2])
+        print(result if result else f"No data for {argv[1]} on or after {argv[2]}.")
+        return 0
+    print(__doc__)
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,137 @@
+import argparse
+import logging
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+# --- CONFIGURATION ---
+METRICS_DB_FILE = "run_metrics.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    script TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    wall_seconds REAL NOT NULL,
+    exit_code INTEGER,
+    timed_out INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    user_cpu_seconds REAL,
+    sys_cpu_seconds REAL,
+    max_rss_kb INTEGER,  -- peak memory of the run: summed RSS of the script's process tree, or its cgroup's memory.peak; NULL if unmeasured
+    limit_breach TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_script_started ON runs (script, started_at);
+"""
+
+def connect(db_path=METRICS_DB_FILE):
+    """Opens the metrics store, creating the schema on first use."""
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(runs)")}
+    if "limit_breach" not in columns:  # Stores created before resource limits existed.
+        conn.execute("ALTER TABLE runs ADD COLUMN limit_breach TEXT")
+    return conn
+
+def record_run(run, db_path=METRICS_DB_FILE):
+    """Appends one run record (a dict as built by master_controller.run_script)."""
+    try:
+        conn = connect(db_path)
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO runs (script, started_at, wall_seconds, exit_code, timed_out, status, "
+                    "user_cpu_seconds, sys_cpu_seconds, max_rss_kb, limit_breach) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (run["script"], run["started_at"], run["wall_seconds"], run["exit_code"], int(run["timed_out"]),
+                     run["status"], run["user_cpu_seconds"], run["sys_cpu_seconds"], run["max_rss_kb"], run.get("limit_breach"))
+                )
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        # Metrics must never take the controller down with them.
+        logging.error(f"Could not record run metrics for '{run['script']}': {e}")
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))  # ceil without floats
+    return sorted_values[int(rank) - 1]
+
+def parse_time_arg(value, now=None):
+    """Accepts a relative age ('90m', '24h', '7d') or an ISO date/datetime and returns a unix timestamp."""
+    now = time.time() if now is None else now
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd])", value.strip())
+    if match:
+        amount, unit = float(match.group(1)), match.group(2)
+        return now - amount * {"s": 1, "m": 60, "h": 3600, "d": 86400}[unit]
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid time '{value}'. Use e.g. '24h', '7d' or '2025-01-31T08:00'.")
+
+def summarize_runs(conn, since=None, until=None, script=None):
+    """Returns per-script duration and peak-memory percentiles for runs in the given window."""
+    query = "SELECT script, status, wall_seconds, max_rss_kb FROM runs WHERE 1=1"
+    params = []
+    if since is not None: query += " AND started_at >= ?"; params.append(since)
+    if until is not None: query += " AND started_at < ?"; params.append(until)
+    if script: query += " AND script = ?"; params.append(script)
+
+    per_script = {}
+    for name, status, wall, rss in conn.execute(query, params):
+        entry = per_script.setdefault(name, {"runs": 0, "failures": 0, "timeouts": 0, "limits": 0, "durations": [], "rss": []})
+        entry["runs"] += 1
+        if status == "timeout": entry["timeouts"] += 1
+        elif status == "limit_exceeded": entry["limits"] += 1
+        elif status != "ok": entry["failures"] += 1
+        entry["durations"].append(wall)
+        if rss is not None: entry["rss"].append(rss)
+
+    summary = []
+    for name in sorted(per_script):
+        entry = per_script[name]
+        durations, rss = sorted(entry["durations"]), sorted(entry["rss"])
+        summary.append({
+            "script": name, "runs": entry["runs"], "failures": entry["failures"], "timeouts": entry["timeouts"],
+            "limit_breaches": entry["limits"],
+            **{f"p{p}_seconds": percentile(durations, p) for p in (50, 95, 99)},
+            **{f"p{p}_rss_mb": (percentile(rss, p) / 1024 if rss else None) for p in (50, 95, 99)},
+            "max_rss_mb": rss[-1] / 1024 if rss else None,
+        })
+    return summary
+
+def format_report(summary):
+    """Renders the summary as a fixed-width text table."""
+    if not summary:
+        return "No runs recorded in this window."
+    fmt = lambda v, spec: "-" if v is None else format(v, spec)
+    header = f"{'script':<28}{'runs':>6}{'fail':>6}{'t/o':>5}{'lim':>5}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'p50 MB':>9}{'p95 MB':>9}{'p99 MB':>9}{'max MB':>9}"
+    lines = [header, "-" * len(header)]
+    for row in summary:
+        lines.append(
+            f"{row['script'][:27]:<28}{row['runs']:>6}{row['failures']:>6}{row['timeouts']:>5}{row['limit_breaches']:>5}"
+            f"{fmt(row['p50_seconds'], '9.1f')}{fmt(row['p95_seconds'], '9.1f')}{fmt(row['p99_seconds'], '9.1f')}"
+            f"{fmt(row['p50_rss_mb'], '9.0f')}{fmt(row['p95_rss_mb'], '9.0f')}{fmt(row['p99_rss_mb'], '9.0f')}{fmt(row['max_rss_mb'], '9.0f')}"
+        )
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report duration and peak-memory percentiles for scripts run by master_controller.")
+    parser.add_argument("--since", type=parse_time_arg, default=parse_time_arg("7d"), help="Window start: age like '24h'/'7d' or an ISO date (default: 7d).")
+    parser.add_argument("--until", type=parse_time_arg, default=None, help="Window end: age or ISO date (default: now).")
+    parser.add_argument("--script", default=None, help="Only report on this script.")
+    parser.add_argument("--db", default=METRICS_DB_FILE, help=f"Metrics database (default: {METRICS_DB_FILE}).")
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    try:
+        print(format_report(summarize_runs(conn, args.since, args.until, args.script)))
+    finally:
+        conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,10 +4,13 @@ import os
 from moviepy.editor import ImageClip, AudioFileClip, concatenate_videoclips, concatenate_audioclips, AudioClip
 from gtts import gTTS
 import json
+import mem_profile
+import preview
 
 FPS = 60
 LANGUAGE = 'en'  # English language for TTS
 IMAGE_PATTERN = "slide_{:02d}.png"  # Matches slide_01.png, slide_02.png, etc.
+OUTPUT_FILE = "cat_story.mp4"
 
 async def generate_audio(sentences, output_dir="audio"):
     if not os.path.exists(output_dir):
@@ -29,7 +32,8 @@ async def main():
     story = data['story']
 
     # Generate audio files
-    await generate_audio(story)
+    with mem_profile.stage("tts"):
+        await generate_audio(story)
 
     # Assume images are named based on IMAGE_PATTERN
     image_files = []
@@ -43,21 +47,24 @@ async def main():
 
     audio_clips = []
     video_clips = []
+    slide_paths = []
 
     # Create audio and video clips for each sentence
-    for i, sentence in enumerate(story, 1):
-        image_path = IMAGE_PATTERN.format(i)
-        if os.path.exists(image_path):
-            audio_path = f"audio/audio{i}.wav"  # Use .wav instead of .mp3
-            if os.path.exists(audio_path):
-                audio_clip = AudioFileClip(audio_path).volumex(1.0)  # Ensure volume is not muted
-                image_clip = ImageClip(image_path).set_duration(audio_clip.duration)
-                video_clips.append(image_clip)
-                audio_clips.append(audio_clip)
+    with mem_profile.stage("load clips"):
+        for i, sentence in enumerate(story, 1):
+            image_path = IMAGE_PATTERN.format(i)
+            if os.path.exists(image_path):
+                audio_path = f"audio/audio{i}.wav"  # Use .wav instead of .mp3
+                if os.path.exists(audio_path):
+                    audio_clip = AudioFileClip(audio_path).volumex(1.0)  # Ensure volume is not muted
+                    image_clip = ImageClip(image_path).set_duration(audio_clip.duration)
+                    video_clips.append(image_clip)
+                    slide_paths.append(image_path)
+                    audio_clips.append(audio_clip)
+                else:
+                    print(f"Warning: Audio file {audio_path} not found!")
             else:
-                print(f"Warning: Audio file {audio_path} not found!")
-        else:
-            print(f"Warning: Image {image_path} not found, skipping sentence {i}")
+                print(f"Warning: Image {image_path} not found, skipping sentence {i}")
 
     if not video_clips:
         print("Error: No video clips to concatenate. Check image and audio files.")
@@ -70,8 +77,20 @@ async def main():
     if final_audio:
         final_video = final_video.set_audio(final_audio)
 
+    if preview.ENABLED:
+        # Draft: half resolution (scaled by ffmpeg, not per frame in Python), low fps, ultrafast preset.
+        if preview.CONTACT_SHEET:
+            frames = [(path, f"{i}. {clip.duration:.1f}s") for i, (path, clip) in enumerate(zip(slide_paths, video_clips), 1)]
+            print(f"Contact sheet saved to {preview.contact_sheet(frames, os.path.splitext(preview.preview_path(OUTPUT_FILE))[0] + '_sheet.png')}")
+        with mem_profile.stage("write preview"):
+            final_video.write_videofile(preview.preview_path(OUTPUT_FILE), fps=preview.PREVIEW_FPS, codec="libx264", preset=preview.PREVIEW_PRESET,
+                                        audio_codec="aac", audio_bitrate=preview.PREVIEW_AUDIO_BITRATE,
+                                        ffmpeg_params=['-crf', str(preview.PREVIEW_CRF), '-vf', f"scale=trunc(iw*{preview.PREVIEW_SCALE}/2)*2:-2"])
+        return
+
     # Write the final video file with audio-compatible codec
-    final_video.write_videofile("cat_story.mp4", fps=FPS, codec="libx264", audio_codec="aac", audio_bitrate="192k")
+    with mem_profile.stage("write video"):
+        final_video.write_videofile(OUTPUT_FILE, fps=FPS, codec="libx264", audio_codec="aac", audio_bitrate="192k")
 
 if platform.system() == "Emscripten":
     asyncio.ensure_future(main())
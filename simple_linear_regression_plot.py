@@ -1,10 +1,40 @@
-import matplotlib.pyplot as plt
+import sys
 import numpy as np
+import figure_cache
+import regression
 
 x = [1,2,2.5,3,4]
 y = [1,4,7,9,15]
+# Line fit: ols (default), huber or ransac, e.g. `python simple_linear_regression_plot.py huber --no-show`
+MODES = ("ols", "huber", "ransac")
+mode = next((arg for arg in sys.argv[1:] if arg in MODES), "ols")
 
-plt.plot(x,y,'ro')
-plt.axis([0,6,0,20])
-plt.plot(np.unique(x), np.poly1d(np.polyfit(x,y,1))(np.unique(x)))
-plt.show()
+fits = regression.fit_polynomials(x, y, degrees=(1, 2, 3))
+for i, degree in enumerate(fits["degrees"]):
+    print(f"degree {degree}: R² = {fits['r2'][i, 0]:.4f}, adjusted R² = {fits['adj_r2'][i, 0]:.4f}, RMSE = {fits['rmse'][i, 0]:.4f}")
+print(f"best degree: {fits['best_degree'][0]}")
+
+def draw_regression(plt, spec):
+    bands = spec["bands"]
+    plt.fill_between(bands["grid"], bands["prediction_lower"], bands["prediction_upper"], color='tab:blue', alpha=0.12, label='95% prediction band (OLS bootstrap)')
+    plt.fill_between(bands["grid"], bands["confidence_lower"], bands["confidence_upper"], color='tab:blue', alpha=0.3, label='95% confidence band (OLS bootstrap)')
+    inliers = np.asarray(spec["inliers"])
+    plt.plot(np.asarray(spec["x"])[inliers], np.asarray(spec["y"])[inliers], 'ro')
+    if not inliers.all():
+        plt.plot(np.asarray(spec["x"])[~inliers], np.asarray(spec["y"])[~inliers], 'kx', markersize=9, label='outliers')
+    plt.axis(spec["axis"])
+    plt.plot(spec["line_x"], spec["line_y"], label=f'{spec["mode"]} fit')
+    plt.legend(loc='upper left')
+
+# Saved through figure_cache and displayed; an unchanged plot is shown from the cache instead of being redrawn.
+line_x = np.unique(x)
+bands = regression.bootstrap_bands(x, y, np.linspace(0, 6, 121), degree=1, seed=0)  # Fixed seed keeps the cache key stable
+if mode == "huber":
+    line_fit = regression.huber_fit(x, y, degree=1); inliers = line_fit["inliers"][0]
+elif mode == "ransac":
+    line_fit = regression.ransac_fit(x, y, degree=1, seed=0); inliers = line_fit["inliers"]
+else:
+    line_fit, inliers = fits, np.ones(len(x), dtype=bool)
+spec = {"mode": mode, "x": x, "y": y, "axis": [0,6,0,20], "line_x": line_x, "line_y": regression.predict(line_fit, line_x, 1)[0],
+        "inliers": inliers, "bands": bands}
+figure_cache.render('regression_plot.png', draw_regression, spec, show=figure_cache.should_show(sys.argv[1:]))
@@ -0,0 +1,67 @@
+"""
+Import-time budget for the pipeline scripts.
+
+Each script is imported in a fresh interpreter with `python -X importtime` and the cumulative time of its
+top-level imports is compared with IMPORT_BUDGET_MS. The slowest imports are listed so a regression (a heavy
+library pulled back to module level) is easy to spot. Exits 1 when any script is over budget.
+
+Usage:
+  python startup_budget.py                      # check every script in SCRIPTS
+  python startup_budget.py news chart_3 --top 5 # check some scripts, show 5 imports each
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+SCRIPTS = ["master_controller", "news", "chart_3", "meme_hype"]
+IMPORT_BUDGET_MS = 500
+TOP_IMPORTS = 10
+
+def measure_imports(module):
+    """Imports module in a fresh interpreter. Returns [(cumulative_us, name)] for the module and its direct imports."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        # Scripts that exit on a missing key or dependency log to stdout; the traceback, if any, is in stderr.
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        details = "\n".join(part for part in (result.stdout.strip(), "\n".join(errors).strip()) if part)
+        raise RuntimeError(f"'import {module}' failed (exit code {result.returncode}):\n{details}")
+    imports, pending = [], []
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package". A package is reported after everything it
+        # imported, and nesting is shown by indenting the name two spaces per level (after one leading space).
+        if not line.startswith("import time:") or "|" not in line: continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit(): continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            pending.append((int(cumulative), name.strip()))
+        elif depth == 0:
+            if name.strip() == module:
+                imports = pending + [(int(cumulative), module)]
+            pending = []
+    return imports
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Check the import time of the pipeline scripts.")
+    parser.add_argument("scripts", nargs="*", default=SCRIPTS, help="module names (default: all pipeline scripts)")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=TOP_IMPORTS, help="how many of the slowest imports to list")
+    args = parser.parse_args(argv)
+
+    over_budget = []
+    for module in args.scripts:
+        try: imports = measure_imports(module)
+        except RuntimeError as e:
+            print(e); over_budget.append(module); continue
+        total_ms = imports[-1][0] / 1000 if imports else 0.0
+        status = "OK" if total_ms <= args.budget_ms else "OVER BUDGET"
+        print(f"{module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms) {status}")
+        for us, name in sorted(imports[:-1], reverse=True)[:args.top]:
+            print(f"  {us / 1000:8.1f} ms  {name}")
+        if total_ms > args.budget_ms: over_budget.append(module)
+    return 1 if over_budget else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
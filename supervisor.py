@@ -0,0 +1,186 @@
+import asyncio
+import collections
+import logging
+import os
+import re
+import resource
+import signal
+import time
+from logging.handlers import RotatingFileHandler
+
+# --- CONFIGURATION ---
+LOG_DIR = "logs"
+MAX_LOG_BYTES = 5 * 1024 * 1024  # Per file; each script keeps LOG_BACKUP_COUNT rotated copies.
+LOG_BACKUP_COUNT = 3
+MAX_LINE_BYTES = 64 * 1024  # Longer lines (e.g. ffmpeg progress without newlines) are truncated.
+STDERR_TAIL_LINES = 40  # Kept in memory so failures can still be reported in the controller log.
+KILL_GRACE_SECONDS = 10  # Time between SIGTERM and SIGKILL for the child's process group.
+RSS_SAMPLE_SECONDS = 0.25  # How often the RSS of the child's session (script + ffmpeg/chromium) is summed while it runs.
+RSS_FIRST_SAMPLE_SECONDS = 0.01  # Sampling starts this fast and doubles up to RSS_SAMPLE_SECONDS, so short runs get read too.
+
+# The run currently being supervised, reported on SIGUSR1.
+_ACTIVE_RUN = None
+
+def _status_handler(signum, frame):
+    if _ACTIVE_RUN is None:
+        logging.info("Status: idle, no script running.")
+        return
+    elapsed = time.monotonic() - _ACTIVE_RUN["started"]
+    logging.info(f"Status: '{_ACTIVE_RUN['name']}' (pid {_ACTIVE_RUN['pid']}) running for {elapsed:.1f}s, "
+                 f"{_ACTIVE_RUN['lines']} output lines logged to {_ACTIVE_RUN['log_path']}.")
+
+def install_status_handler():
+    """Makes `kill -USR1 <controller pid>` log what the controller is doing, whether a child is running or not."""
+    signal.signal(signal.SIGUSR1, _status_handler)
+
+def get_child_logger(name, log_dir=LOG_DIR):
+    """Returns a size-capped rotating file logger for one script's output."""
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', os.path.splitext(os.path.basename(name))[0])
+    child_logger = logging.getLogger(f"child.{safe_name}")
+    if not child_logger.handlers:
+        os.makedirs(log_dir, exist_ok=True)
+        handler = RotatingFileHandler(os.path.join(log_dir, f"{safe_name}.log"), maxBytes=MAX_LOG_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s [%(stream)s] %(message)s'))
+        child_logger.addHandler(handler)
+        child_logger.setLevel(logging.INFO)
+        child_logger.propagate = False
+    return child_logger
+
+async def _pump(stream, label, child_logger, run, tail=None):
+    """Copies a child stream to the log line by line, so memory use is bounded by MAX_LINE_BYTES."""
+    while True:
+        try:
+            line = await stream.readline()
+        except ValueError:
+            # The reader already discarded the oversized chunk; keep going with the rest of the stream.
+            child_logger.info(f"[line truncated: longer than {MAX_LINE_BYTES} bytes]", extra={"stream": label})
+            continue
+        if not line:
+            break
+        text = line.decode('utf-8', errors='replace').rstrip()
+        child_logger.info(text, extra={"stream": label})
+        run["lines"] += 1
+        if tail is not None:
+            tail.append(text)
+
+def read_peak_rss_kb(pid):
+    """The process's own RSS high-water mark (VmHWM, KiB) from /proc, or None if it is gone or /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmHWM:"): return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def session_rss_kb(session_id):
+    """
+    Summed resident memory (KiB) of every process in the session: the script plus its ffmpeg/chromium descendants,
+    including ones orphaned by a parent that already exited. None if /proc is unavailable.
+    """
+    try: pids = [name for name in os.listdir("/proc") if name.isdigit()]
+    except OSError: return None
+    page_kb, total = os.sysconf("SC_PAGE_SIZE") // 1024, 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat", 'r') as f: fields = f.read().rpartition(')')[2].split()
+            if int(fields[3]) != session_id: continue  # state ppid pgrp session ...
+            with open(f"/proc/{pid}/statm", 'r') as f: total += int(f.read().split()[1]) * page_kb
+        except (OSError, ValueError, IndexError):
+            continue
+    return total
+
+def _record_rss(pid, result):
+    """Folds the current session total and the script's own VmHWM (which also covers the gaps between samples) into result."""
+    readings = [value for value in (session_rss_kb(pid), read_peak_rss_kb(pid)) if value]
+    if readings: result["max_rss_kb"] = max(readings + [result["max_rss_kb"] or 0])
+
+async def _sample_peak_rss(pid, result):
+    """Samples until cancelled; the child runs in its own session, so its pid is also the session id."""
+    delay = RSS_FIRST_SAMPLE_SECONDS
+    while True:
+        await asyncio.sleep(delay)
+        _record_rss(pid, result)
+        delay = min(delay * 2, RSS_SAMPLE_SECONDS)
+
+async def _kill_process_group(proc):
+    """SIGTERMs the child's whole process group (ffmpeg, chromium, ...), escalating to SIGKILL."""
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+    try:
+        await asyncio.wait_for(proc.wait(), KILL_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        logging.warning(f"Process group {proc.pid} ignored SIGTERM. Sending SIGKILL.")
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+
+async def supervise(cmd, name, timeout, log_dir=LOG_DIR, preexec_fn=None, env=None):
+    """
+    Runs cmd in its own process group, streaming stdout/stderr into a rotating log file.
+    Enforces the timeout and stops early on SIGINT/SIGTERM, killing the whole group either way.
+    preexec_fn runs in the child before exec (used for rlimits, nice and cgroup placement); env replaces its environment.
+    Returns a dict with exit_code, timed_out, interrupted, stderr_tail, log_path and max_rss_kb: the peak summed RSS
+    of the child's session, sampled at most RSS_SAMPLE_SECONDS apart plus a last reading at exit, and never below the
+    child's own exact peak when rusage can attribute it (None when nothing could be measured).
+    """
+    global _ACTIVE_RUN
+    child_logger = get_child_logger(name, log_dir)
+    log_path = child_logger.handlers[0].baseFilename
+    tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    result = {"exit_code": None, "timed_out": False, "interrupted": False, "stderr_tail": [], "log_path": log_path, "max_rss_kb": None}
+    sampler = None
+    children_peak_before = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            start_new_session=True, limit=MAX_LINE_BYTES, preexec_fn=preexec_fn, env=env
+        )
+        run = {"name": name, "pid": proc.pid, "started": time.monotonic(), "lines": 0, "log_path": log_path}
+        _ACTIVE_RUN = run
+        sampler = asyncio.ensure_future(_sample_peak_rss(proc.pid, result))
+        pumps = asyncio.gather(
+            _pump(proc.stdout, "stdout", child_logger, run),
+            _pump(proc.stderr, "stderr", child_logger, run, tail)
+        )
+        waiter = asyncio.ensure_future(proc.wait())
+        stopper = asyncio.ensure_future(stop.wait())
+        done, _ = await asyncio.wait({waiter, stopper}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        stopper.cancel()
+        sampler.cancel()
+        _record_rss(proc.pid, result)  # Last reading: the script if still running, or descendants that outlived it
+        if waiter not in done:
+            result["interrupted"] = stopper in done
+            result["timed_out"] = not result["interrupted"]
+            await _kill_process_group(proc)
+        # ru_maxrss over reaped children only grows, so a rise since the spawn is exactly this run's largest single
+        # process (the script or a descendant it waited for); it catches runs shorter than one sample interval.
+        children_peak_after = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        if children_peak_after > children_peak_before:
+            result["max_rss_kb"] = max(children_peak_after, result["max_rss_kb"] or 0)
+        try:
+            # Orphaned grandchildren can hold the pipes open after the child exits; don't wait on them forever.
+            await asyncio.wait_for(pumps, KILL_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            child_logger.info("[output still open after child exit; stopped reading]", extra={"stream": "supervisor"})
+        result["exit_code"] = proc.returncode
+    finally:
+        if sampler: sampler.cancel()
+        _ACTIVE_RUN = None
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+    result["stderr_tail"] = list(tail)
+    return result
+
+def run_supervised(cmd, name, timeout, log_dir=LOG_DIR, preexec_fn=None, env=None):
+    """Synchronous entry point for supervise()."""
+    return asyncio.run(supervise(cmd, name, timeout, log_dir, preexec_fn, env))
@@ -0,0 +1,63 @@
+import pytest
+
+import near_dup
+
+# The same event as written up by two different wire/feed outlets (headline + summary, as news.py hashes them).
+DUPLICATES = [
+    ("Senate passes stopgap bill to avert government shutdown hours before deadline. The Senate approved a short-term spending bill late Friday that keeps federal agencies funded through mid-December, sending the measure to the president's desk just hours before a shutdown would have begun.",
+     "Senate approves temporary funding measure, averting shutdown. Senators voted late Friday to pass a stopgap spending bill that funds the government into December, clearing the way for the president to sign it hours ahead of a midnight shutdown deadline."),
+    ("Federal Reserve holds interest rates steady, signals cuts later this year. The Federal Reserve left its benchmark interest rate unchanged on Wednesday but indicated that officials still expect to lower rates later this year as inflation continues to ease.",
+     "Fed keeps rates unchanged, still sees cuts this year as inflation cools. The Federal Reserve held its key interest rate steady Wednesday, while policymakers signaled they still anticipate cutting rates later in the year as inflation keeps easing."),
+    ("Magnitude 7.4 earthquake strikes off Taiwan's east coast, triggering tsunami warnings. A powerful magnitude 7.4 earthquake struck off the eastern coast of Taiwan on Wednesday morning, damaging buildings in Hualien and prompting tsunami warnings in Japan and the Philippines.",
+     "Strong earthquake hits Taiwan, tsunami warnings issued for Japan and Philippines. A magnitude 7.4 quake struck off Taiwan's eastern coast on Wednesday morning, damaging buildings in the city of Hualien and prompting tsunami warnings across the region."),
+    ("Boeing CEO to step down at end of year amid safety crisis. Boeing's chief executive will leave the company at the end of the year as part of a broad management shake-up following a mid-air panel blowout on a 737 Max jet in January.",
+     "Boeing chief executive to leave company by year's end in management overhaul. The head of Boeing will step down at the end of this year, the company said, in a sweeping leadership shake-up after a door panel blew out of a 737 Max jet in January."),
+]
+# Unrelated stories from the same feeds.
+UNRELATED = [
+    "House Republicans unveil farm bill with cuts to food assistance programs. The House Agriculture Committee released a draft farm bill on Friday that would trim spending on nutrition programs while boosting crop insurance subsidies.",
+    "Senate confirms new ambassador to Japan after monthslong delay. The Senate voted on Tuesday to confirm the nominee for ambassador to Japan, ending a hold that had kept the post vacant since the spring.",
+    "Bank of England cuts interest rates for the first time since 2020. The Bank of England lowered its benchmark rate by a quarter point on Thursday, saying inflation had fallen close enough to its target to begin easing policy.",
+    "Heavy rains trigger deadly landslides in southern India. Landslides set off by torrential monsoon rains buried villages in Kerala on Tuesday, killing dozens of people and leaving hundreds missing, officials said.",
+    "Airbus raises delivery target as jet demand stays strong. Airbus said on Wednesday it now expects to deliver more aircraft this year than previously forecast, citing strong demand from airlines and easing supply chain problems.",
+]
+# Same topic, different event: these must stay separate stories.
+SAME_TOPIC = [
+    (DUPLICATES[1][0], "Federal Reserve cuts interest rates by half a point in first reduction since 2020. The Federal Reserve lowered its benchmark interest rate by half a percentage point on Wednesday, its first cut in four years, as officials grew more worried about the job market."),
+    (DUPLICATES[2][0], "Magnitude 6.1 earthquake shakes northern Japan, no tsunami expected. A magnitude 6.1 earthquake struck off the coast of northern Japan on Sunday evening, shaking buildings in Sendai, but officials said there was no risk of a tsunami."),
+    (DUPLICATES[3][0], "Boeing reports wider quarterly loss as 737 Max production slows. Boeing posted a bigger loss than expected for the quarter on Wednesday after regulators capped output of its 737 Max jet following a mid-air panel blowout in January."),
+]
+
+
+def index_of(stories):
+    index = near_dup.new_index()
+    for story in stories:
+        near_dup.add(index, near_dup.minhash(story), story[:40])
+    return index
+
+
+@pytest.mark.parametrize("original, rewrite", DUPLICATES)
+def test_cross_feed_rewrite_is_flagged(original, rewrite):
+    index = index_of([original] + UNRELATED)
+    match = near_dup.find_duplicate(index, near_dup.minhash(rewrite))
+    assert match is not None and match[0] == original[:40]
+
+
+@pytest.mark.parametrize("story", UNRELATED)
+def test_unrelated_story_is_not_flagged(story):
+    index = index_of([story for pair in DUPLICATES for story in pair])
+    assert near_dup.find_duplicate(index, near_dup.minhash(story)) is None
+
+
+@pytest.mark.parametrize("story, other_event", SAME_TOPIC)
+def test_same_topic_different_event_is_not_flagged(story, other_event):
+    assert near_dup.find_duplicate(index_of([story]), near_dup.minhash(other_event)) is None
+
+
+def test_signatures_from_an_older_format_are_ignored(tmp_path):
+    path = tmp_path / "signatures.json"
+    near_dup.save_signatures(str(path), [(near_dup.minhash(DUPLICATES[0][0]), "current")], window_hours=48)
+    stored = path.read_text().replace('[{', '[{"signature": [1, 2, 3], "label": "old", "time": 9e99}, {', 1)
+    path.write_text(stored)
+    index = near_dup.load_index(str(path), window_hours=48)
+    assert [entry["label"] for entry in index["entries"]] == ["current"]
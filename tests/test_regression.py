@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+import regression
+
+
+def test_fit_polynomials_matches_polyfit_on_shared_x():
+    rng = np.random.default_rng(0)
+    x = np.linspace(-3, 7, 25)
+    y = rng.normal(size=(6, len(x))) + 0.5 * x ** 2 - x
+    fits = regression.fit_polynomials(x, y, degrees=(1, 2, 3))
+    for i, degree in enumerate(fits["degrees"]):
+        predicted = regression.predict(fits, x, degree)
+        for s in range(len(y)):
+            expected = np.polyval(np.polyfit(x, y[s], degree), x)
+            np.testing.assert_allclose(predicted[s], expected, rtol=1e-9, atol=1e-9)
+            residual_ss = ((y[s] - expected) ** 2).sum()
+            total_ss = ((y[s] - y[s].mean()) ** 2).sum()
+            assert fits["r2"][i, s] == pytest.approx(1 - residual_ss / total_ss, rel=1e-9)
+            assert fits["rmse"][i, s] == pytest.approx(np.sqrt(residual_ss / len(x)), rel=1e-9)
+            n, terms = len(x), degree + 1
+            assert fits["adj_r2"][i, s] == pytest.approx(1 - (residual_ss / total_ss) * (n - 1) / (n - terms), rel=1e-9)
+    best = np.nanargmax(fits["adj_r2"], axis=0)
+    np.testing.assert_array_equal(fits["best_degree"], fits["degrees"][best])
+
+
+def test_fit_polynomials_drops_nan_points_per_series():
+    rng = np.random.default_rng(1)
+    x = rng.uniform(0, 10, size=(5, 30))
+    y = 2.0 + 0.3 * x - 0.05 * x ** 2 + rng.normal(0, 0.1, size=x.shape)
+    x[0, :4] = np.nan
+    y[1, 10:20] = np.nan
+    y[2, ::3] = np.nan
+    fits = regression.fit_polynomials(x, y, degrees=(2,))
+    for s in range(len(y)):
+        keep = np.isfinite(x[s]) & np.isfinite(y[s])
+        assert fits["n"][s] == keep.sum()
+        grid = np.linspace(np.nanmin(x[s]), np.nanmax(x[s]), 7)
+        t = (grid - fits["offset"][s]) / fits["scale"][s]
+        predicted = np.polynomial.polynomial.polyval(t, fits["coefficients"][0, s])
+        expected = np.polyval(np.polyfit(x[s][keep], y[s][keep], 2), grid)
+        np.testing.assert_allclose(predicted, expected, rtol=1e-8, atol=1e-8)
+
+
+def test_fit_polynomials_reports_nan_when_degree_is_not_identifiable():
+    x = np.array([[1.0, 1.0, 2.0, 2.0, 2.0], [0.0, 1.0, 2.0, 3.0, 4.0]])
+    y = np.array([[1.0, 2.0, 3.0, 4.0, 5.0], [1.0, 3.0, 5.0, 7.0, 9.0]])
+    fits = regression.fit_polynomials(x, y, degrees=(1, 2))
+    # Two distinct x values support a line but not a parabola.
+    assert np.isfinite(fits["r2"][0, 0]) and np.isnan(fits["r2"][1, 0])
+    assert np.isnan(fits["coefficients"][1, 0]).all()
+    assert fits["best_degree"][0] == 1
+    assert fits["r2"][0, 1] == pytest.approx(1.0)
+
+
+def test_fit_windows_matches_individual_fits():
+    rng = np.random.default_rng(2)
+    values = np.cumsum(rng.normal(size=(40, 3)), axis=0)
+    window, step = 10, 3
+    fits = regression.fit_windows(values, window, degrees=(1, 2), step=step)
+    starts = range(0, len(values) - window + 1, step)
+    assert fits["r2"].shape == (2, len(starts), 3)
+    for w, start in enumerate(starts):
+        single = regression.fit_polynomials(np.arange(window), values[start:start + window].T, degrees=(1, 2))
+        np.testing.assert_allclose(fits["r2"][:, w], single["r2"], rtol=1e-9)
+        np.testing.assert_allclose(fits["coefficients"][:, w], single["coefficients"], rtol=1e-9, atol=1e-12)
+
+
+def brute_force_bootstrap(x, y, grid, degree, samples, level, chunk_size, seed):
+    """Same resamples as bootstrap_bands (same RNG draw order), each solved on its own with np.polyfit."""
+    rng = np.random.default_rng(seed)
+    n, inflation = len(x), np.sqrt(len(x) / (len(x) - degree - 1))
+    curves, predictions = [], []
+    for start in range(0, samples, chunk_size):
+        index = rng.integers(0, n, size=(min(chunk_size, samples - start), n))
+        usable = [row for row in index if len(np.unique(x[row])) > degree]
+        fits = [np.polyfit(x[row], y[row], degree) for row in usable]
+        picks = np.take_along_axis(np.array(usable), rng.integers(0, n, size=(len(usable), len(grid))), axis=1)
+        for coefficients, pick in zip(fits, picks):
+            curve = np.polyval(coefficients, grid)
+            curves.append(curve)
+            predictions.append(curve + (y[pick] - np.polyval(coefficients, x[pick])) * inflation)
+    tail = (1 - level) / 2 * 100
+    return np.percentile(curves, [tail, 100 - tail], axis=0), np.percentile(predictions, [tail, 100 - tail], axis=0), len(curves)
+
+
+@pytest.mark.parametrize("degree, chunk_size", [(1, 250), (2, 64)])
+def test_bootstrap_bands_match_per_resample_fits(degree, chunk_size):
+    rng = np.random.default_rng(3)
+    x = np.array([1, 2, 2.5, 3, 4, 5, 6, 6.5, 7, 9], dtype=float)
+    y = 1 + 2 * x + rng.normal(0, 1.5, size=len(x))
+    grid = np.linspace(0, 10, 11)
+    bands = regression.bootstrap_bands(x, y, grid, degree=degree, samples=500, chunk_size=chunk_size, seed=11)
+    confidence, prediction, used = brute_force_bootstrap(x, y, grid, degree, 500, 0.95, chunk_size, seed=11)
+    assert bands["samples"] == used
+    np.testing.assert_allclose([bands["confidence_lower"], bands["confidence_upper"]], confidence, rtol=1e-7, atol=1e-7)
+    np.testing.assert_allclose([bands["prediction_lower"], bands["prediction_upper"]], prediction, rtol=1e-7, atol=1e-7)
+    np.testing.assert_allclose(bands["fit"], np.polyval(np.polyfit(x, y, degree), grid), rtol=1e-9)
+
+
+def test_ransac_ignores_outliers_and_keeps_sampling_without_inliers():
+    x = np.arange(20.0)
+    y = 2 * x + 1
+    y[[3, 7, 15]] += 40
+    fit = regression.ransac_fit(x, y, seed=0)
+    assert not fit["inliers"][[3, 7, 15]].any() and fit["inliers"].sum() == 17
+    np.testing.assert_allclose(regression.predict(fit, [0.0, 10.0], 1)[0], [1.0, 21.0])
+    with pytest.raises(ValueError):
+        regression.ransac_fit(x, y, threshold=-1.0, seed=0)
+    assert regression._ransac_trials_needed(0.0, 2) == np.inf
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import roi_matrix
+
+
+def brute_force_recovery(close):
+    days, tickers = close.shape
+    result = np.full(close.shape, days)
+    for column in range(tickers):
+        for i in range(days):
+            if np.isnan(close[i, column]):
+                continue
+            for j in range(i + 1, days):
+                if close[j, column] >= close[i, column]:
+                    result[i, column] = j
+                    break
+    return result
+
+
+def random_closes(days, tickers, seed, nan_fraction=0.1):
+    rng = np.random.default_rng(seed)
+    close = np.exp(np.cumsum(rng.normal(0, 0.05, size=(days, tickers)), axis=0)) * 100
+    close[rng.random(close.shape) < nan_fraction] = np.nan
+    return close
+
+
+@pytest.mark.parametrize("days", [1, 2, 3, 7, 8, 9, 64, 200])
+def test_next_recovery_index_matches_brute_force(days):
+    close = random_closes(days, 4, seed=days)
+    entry = ~np.isnan(close)  # No entry price on missing days; build_roi_matrix masks those out
+    np.testing.assert_array_equal(roi_matrix.next_recovery_index(close)[entry], brute_force_recovery(close)[entry])
+
+
+def test_next_recovery_index_handles_ties_and_monotone_series():
+    close = np.array([[5.0, 1.0, 3.0], [4.0, 2.0, 3.0], [3.0, 3.0, 3.0], [5.0, 4.0, 3.0]])
+    np.testing.assert_array_equal(roi_matrix.next_recovery_index(close), brute_force_recovery(close))
+
+
+def test_build_roi_matrix_metrics():
+    close = random_closes(120, 3, seed=7)
+    dates = pd.date_range("2024-01-01", periods=len(close), freq="D")
+    frames = {ticker: pd.DataFrame({"Close": close[:, k]}, index=dates) for k, ticker in enumerate(["AAA", "BBB", "CCC"])}
+    out_dates, tickers, values = roi_matrix.build_roi_matrix(frames)
+    assert tickers == ["AAA", "BBB", "CCC"] and len(out_dates) == len(close)
+    return_to_today, best_return, recovery_days = values
+
+    recovery = brute_force_recovery(close)
+    for column in range(close.shape[1]):
+        latest = pd.Series(close[:, column]).ffill().iloc[-1]
+        for i in range(len(close)):
+            entry = close[i, column]
+            if np.isnan(entry):
+                assert np.isnan(return_to_today[i, column]) and np.isnan(recovery_days[i, column])
+                continue
+            assert return_to_today[i, column] == pytest.approx(latest / entry - 1, rel=1e-5)
+            assert best_return[i, column] == pytest.approx(np.nanmax(close[i:, column]) / entry - 1, rel=1e-5)
+            expected_days = recovery[i, column] - i if recovery[i, column] < len(close) else np.nan
+            np.testing.assert_equal(recovery_days[i, column], np.float32(expected_days))
+
+
+def test_query_roi_uses_next_trading_day():
+    dates = np.array(["2024-01-01", "2024-01-03"], dtype="datetime64[D]")
+    values = np.arange(6, dtype=np.float32).reshape(3, 2, 1)
+    matrix = {"dates": dates, "tickers": ["BTC"], "values": values}
+    result = roi_matrix.query_roi(matrix, "BTC", "2024-01-02")
+    assert result["entry_date"] == "2024-01-03"
+    assert [result[name] for name in roi_matrix.METRICS] == [1.0, 3.0, 5.0]
+    assert roi_matrix.query_roi(matrix, "BTC", "2024-01-04") is None
@@ -0,0 +1,25 @@
+import sys
+
+import pytest
+
+import supervisor
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="RSS is read from /proc")
+
+GRANDCHILD_MB = 150
+
+
+def test_peak_rss_counts_descendants(tmp_path):
+    # The script itself stays small; the memory is held by a process it spawns, like ffmpeg or chromium.
+    grandchild = f"b = bytearray({GRANDCHILD_MB} * 1024 * 1024); import time; time.sleep(1)"
+    cmd = [sys.executable, "-c", f"import subprocess, sys; subprocess.run([sys.executable, '-c', {grandchild!r}])"]
+    result = supervisor.run_supervised(cmd, "tree", 30, str(tmp_path))
+    assert result["exit_code"] == 0
+    assert result["max_rss_kb"] >= GRANDCHILD_MB * 1024
+
+
+def test_short_run_is_measured(tmp_path):
+    result = supervisor.run_supervised([sys.executable, "-c", "pass"], "short", 30, str(tmp_path))
+    assert result["exit_code"] == 0
+    # At least the interpreter itself, not just the few MB of a process caught right after fork.
+    assert result["max_rss_kb"] >= 5 * 1024